@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.repositories.trade_repository import TradeRepository
-from app.services.analytics_service import AnalyticsService
+from app.services.dashboard_cache import DashboardCache
 
 router = APIRouter()
 
@@ -11,22 +11,44 @@ def get_repository(db: Session = Depends(get_db)):
 
 @router.get("/dashboard")
 def get_dashboard_metrics(interval: str = 'D', repo: TradeRepository = Depends(get_repository)):
+    cache = DashboardCache()
+    # Trade/transaction analytics are served from cache until trades, orders or transactions change
+    analytics, summary = cache.get_or_compute('summary', lambda: _build_summary(repo))
+    # The equity curve also reads today's account candles, so it is only reused for a short while
+    equity_curve = cache.get_or_compute(
+        f"equity_curve:{interval}",
+        lambda: _build_equity_curve(analytics, repo, interval),
+        ttl=cache.live_ttl
+    )
+    return {**summary, "equity_curve": equity_curve}
+
+def _build_summary(repo: TradeRepository):
+    # pandas-heavy; imported on the first dashboard build rather than at startup
+    from app.services.analytics_service import AnalyticsService
     unified_trades = repo.get_unified_trades()
     transactions = repo.get_transactions()
-    daily_ohlc = repo.get_daily_ohlc_from_candles()
     analytics = AnalyticsService(unified_trades)
-    analytics.enrich_data(transactions=transactions, daily_ohlc=daily_ohlc) # Add costs, etc.
-    
-    kpis = analytics.get_kpis()
-    equity_curve = analytics.get_equity_curve(interval=interval).to_dict(orient='records')
-    pnl_distribution = analytics.get_pnl_distribution()
+    analytics.enrich_data(transactions=transactions) # Add costs, etc.
     
-    return {
-        "kpis": kpis,
-        "equity_curve": equity_curve,
-        "pnl_distribution": pnl_distribution
+    return analytics, {
+        "kpis": analytics.get_kpis(),
+        "pnl_distribution": analytics.get_pnl_distribution()
     }
 
+def _build_equity_curve(analytics, repo: TradeRepository, interval: str):
+    # Only the days the chart shows; earlier bars are filtered out after the resample
+    daily_ohlc = repo.get_daily_ohlc_from_candles(start_date=analytics.equity_curve_start(interval))
+    return analytics.get_equity_curve(interval=interval, daily_ohlc=daily_ohlc).to_dict(orient='records')
+
+@router.get("/dashboard/cache-stats")
+def get_dashboard_cache_stats():
+    return DashboardCache().stats()
+
+@router.get("/candle-writer/stats")
+def get_candle_writer_stats():
+    from app.services.live_account_service import LiveAccountService
+    return LiveAccountService().candle_writer_stats()
+
 @router.get("/intraday-equity")
 def get_intraday_equity(db: Session = Depends(get_db)):
     from app.models.all_models import AccountValue
@@ -34,12 +56,13 @@ def get_intraday_equity(db: Session = Depends(get_db)):
     return candles
 
 @router.post("/aggregate")
-def trigger_aggregation(repo: TradeRepository = Depends(get_repository)):
+def trigger_aggregation(full: bool = False, repo: TradeRepository = Depends(get_repository)):
     """
     Triggers the Lambda Architecture batch aggregation.
     Aggregates AccountValue -> DailyAccountValue & WeeklyAccountValue.
+    Incremental from the last aggregated week unless full=true.
     """
-    result = repo.aggregate_account_values()
+    result = repo.aggregate_account_values(full=full)
     return {"message": "Aggregation completed", "stats": result}
 
 @router.get("/daily-equity")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import RedirectResponse
-from app.services.kite_service import KiteClient
+from app.services.kite_service import KiteClientRegistry
+from app.services.market_data_service import MarketDataService
 from app.core.config import get_settings
 
 router = APIRouter()
@@ -11,8 +12,7 @@ def login():
     """
     Redirects the user to Zerodha's login page.
     """
-    kite = KiteClient(api_key=settings.KITE_API_KEY)
-    login_url = kite.get_login_url()
+    login_url = KiteClientRegistry().get_client().get_login_url()
     return RedirectResponse(login_url)
 
 @router.get("/callback")
@@ -24,11 +24,12 @@ def login_callback(request_token: str, status: str = None):
     if status != 'success':
         raise HTTPException(status_code=400, detail="Login failed or denied by user")
         
-    kite = KiteClient(api_key=settings.KITE_API_KEY)
     try:
-        data = kite.kite.generate_session(request_token, api_secret=settings.KITE_API_SECRET)
-        kite.kite.set_access_token(data["access_token"])
-        kite.save_access_token(data["access_token"])
+        # Persists the token and swaps the shared client used by the rest of the app
+        data = KiteClientRegistry().generate_session(request_token)
+        market_data = MarketDataService()
+        market_data.start(settings.KITE_API_KEY, data["access_token"])
+        market_data.pin_open_positions()
         
         # Redirect back to frontend
         return RedirectResponse("http://localhost:3000/?login=success")
@@ -40,11 +41,8 @@ def check_login_status():
     """
     Checks if the current session is valid.
     """
-    kite = KiteClient(api_key=settings.KITE_API_KEY)
-    # Load token from file
-    token = KiteClient.load_access_token()
-    if token:
-        kite.kite.set_access_token(token)
-        if kite.validate_token():
+    registry = KiteClientRegistry()
+    if registry.access_token:
+        if registry.get_client().validate_token():
             return {"status": "connected"}
     return {"status": "disconnected"}
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, HTTPException, Body
-from app.services.kite_service import KiteClient
+from fastapi import APIRouter, HTTPException, Body, Depends
+from app.services.kite_service import KiteClient, get_kite_client
+from app.services.market_data_service import MarketDataService
+from app.services.quote_cache import QuoteCache
+from app.services.margin_cache import MarginCache
 from app.core.config import get_settings
 from typing import List, Dict
 
@@ -7,63 +10,68 @@ router = APIRouter()
 settings = get_settings()
 
 @router.post("/ltp")
-def get_ltp(instruments: List[str] = Body(...)):
+def get_ltp(instruments: List[str] = Body(...), kite: KiteClient = Depends(get_kite_client)):
     """
     Fetch LTP for a list of instruments.
     """
     try:
-        # In a real app, manage token better.
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              raise HTTPException(status_code=401, detail="Not connected to Zerodha")
-             
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         
         # Validate token if needed, but for speed maybe skip full validation if we trust the file?
         # kite.validate_token() # Optional, adds latency
         
-        ltp_map = kite.fetch_ltp(instruments)
+        ltp_map = MarketDataService().get_ltp(instruments, kite)
         return ltp_map
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/quote-cache/stats")
+def get_quote_cache_stats():
+    """
+    Upstream kite.quote calls versus requests served by the quote cache.
+    """
+    return QuoteCache().stats()
+
 @router.get("/status")
-def get_market_status():
+def get_market_status(kite: KiteClient = Depends(get_kite_client)):
     """
     Check if the market is open.
     """
     try:
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              return {"open": False, "reason": "Not connected"}
              
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         is_open = kite.is_market_open()
         return {"open": is_open}
     except Exception as e:
         return {"open": False, "error": str(e)}
 
 @router.post("/margins")
-def get_margins(items: List[Dict] = Body(...)):
+def get_margins(items: List[Dict] = Body(...), kite: KiteClient = Depends(get_kite_client)):
     """
     Fetch margins for a list of items.
     """
     try:
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              # Return empty margins if not connected, or error?
              # Better to return error so UI knows
              raise HTTPException(status_code=401, detail="Not connected to Zerodha")
              
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         margins = kite.fetch_margins(items)
         return margins
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/margins/cache-stats")
+def get_margin_cache_stats():
+    """
+    Margin requirements served from cache versus re-queried from Kite.
+    """
+    return MarginCache().stats()
 
 @router.post("/exposure")
-def get_exposure(items: List[Dict] = Body(...)):
+def get_exposure(items: List[Dict] = Body(...), kite: KiteClient = Depends(get_kite_client)):
     """
     Calculate delta-adjusted exposure for a list of items.
     """
@@ -71,17 +79,14 @@ def get_exposure(items: List[Dict] = Body(...)):
         from app.services.greeks_service import GreeksService
         greeks_service = GreeksService()
         
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              raise HTTPException(status_code=401, detail="Not connected to Zerodha")
-             
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         
         # 1. Get required instruments
         instruments = greeks_service.get_required_instruments(items)
         
         # 2. Fetch LTP
-        ltp_map = kite.fetch_ltp(instruments)
+        ltp_map = MarketDataService().get_ltp(instruments, kite)
         
         # 3. Calculate Exposure
         exposure = greeks_service.calculate_exposure(items, ltp_map)
@@ -93,55 +98,52 @@ def get_exposure(items: List[Dict] = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/instruments/search")
-def search_instruments(q: str, exchange: str = None):
+def search_instruments(q: str, exchange: str = None, kite: KiteClient = Depends(get_kite_client)):
     """
     Search for instruments.
     """
     try:
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              raise HTTPException(status_code=401, detail="Not connected to Zerodha")
              
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         results = kite.search_instruments(q, exchange=exchange)
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/option-chain/{symbol}")
-def get_option_chain(symbol: str):
+def get_option_chain(symbol: str, kite: KiteClient = Depends(get_kite_client)):
     """
     Fetch option chain for a given symbol (e.g., NIFTY, BANKNIFTY, INFY).
     Returns grouped data with Delta.
     """
     try:
         from app.services.greeks_service import GreeksService
+        from app.services.instrument_service import InstrumentService
         from datetime import date, datetime
-        import pandas as pd
+        import numpy as np
         
-        token = KiteClient.load_access_token()
-        if not token:
+        if not kite.access_token:
              raise HTTPException(status_code=401, detail="Not connected to Zerodha")
              
-        kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
         greeks_service = GreeksService()
         
-        # 1. Fetch all NFO instruments (cached)
-        df = kite.get_all_instruments(exchanges=['NFO'])
-        if df.empty:
-            return {"error": "No instruments found"}
+        # 1. Option chains indexed at instrument sync (name -> expiry -> strikes)
+        instrument_service = InstrumentService()
+        chains = instrument_service.get_option_chains(symbol)
+        if chains is None and not instrument_service.has_option_chains():
+            # No synced instrument file yet; index the live NFO dump once
+            df = kite.get_all_instruments(exchanges=['NFO'])
+            if df.empty:
+                return {"error": "No instruments found"}
+            instrument_service.index_option_chains(df)
+            chains = instrument_service.get_option_chains(symbol)
             
-        # 2. Filter by symbol
-        # Symbol in NFO is usually "NIFTY", "BANKNIFTY", "INFY" in the 'name' column
-        # Filter for OPTIDX (Index Options) or OPTSTK (Stock Options)
-        mask = (df['name'] == symbol) & (df['segment'].isin(['NFO-OPT', 'NFO-FUT'])) # Include FUT for underlying price check? No, underlying is usually Index or Equity
-        
-        # Actually, for NIFTY/BANKNIFTY, underlying is in NSE index.
-        # For Stocks, underlying is in NSE equity.
-        
-        chain_df = df[mask].copy()
+        # 2. Active expiries for the symbol (the 'name' column in NFO, e.g. NIFTY, INFY)
+        today = date.today()
+        expiries = sorted(e for e in (chains or {}) if e >= today)
         
-        if chain_df.empty:
+        if not expiries:
             return {"error": f"No options found for {symbol}"}
             
         # 3. Get Underlying Price
@@ -157,24 +159,31 @@ def get_option_chain(symbol: str):
                 underlying_key = f"NSE:{symbol}"
         
         # Fetch Underlying LTP
-        ltp_map = kite.fetch_ltp([underlying_key])
+        ltp_map = MarketDataService().get_ltp([underlying_key], kite)
         underlying_ltp = ltp_map.get(underlying_key, 0)
         
-        # 4. Prepare for Batch LTP Fetch of Options
-        chain_df['expiry'] = pd.to_datetime(chain_df['expiry']).dt.date
-        expiries = sorted(chain_df['expiry'].unique())
-        
-        # Let's try to do it for the nearest expiry (first one)
+        # 4. Nearest expiry: strikes are sorted, legs aligned with them
         nearest_expiry = expiries[0]
+        all_strikes, ce_legs, pe_legs = chains[nearest_expiry]
         
-        # Filter for nearest expiry
-        target_df = chain_df[chain_df['expiry'] == nearest_expiry]
+        # Find ATM strike (closest to underlying_ltp, lower one on ties) by binary search
+        pos = int(np.searchsorted(all_strikes, underlying_ltp))
+        if pos == len(all_strikes) or (pos > 0 and underlying_ltp - all_strikes[pos - 1] <= all_strikes[pos] - underlying_ltp):
+            pos -= 1
+        atm_index = pos
+        
+        # ATM +/- 20 strikes
+        start_index = max(0, atm_index - 20)
+        end_index = min(len(all_strikes), atm_index + 21) # +21 because slice is exclusive
         
-        # Get tokens for LTP fetch
-        instruments_to_fetch = [f"NFO:{row['tradingsymbol']}" for _, row in target_df.iterrows()]
+        window = range(start_index, end_index)
+        instruments_to_fetch = [
+            f"NFO:{leg['tradingsymbol']}"
+            for i in window for leg in (ce_legs[i], pe_legs[i]) if leg is not None
+        ]
         
         # Fetch LTPs
-        opt_ltp_map = kite.fetch_ltp(instruments_to_fetch)
+        opt_ltp_map = MarketDataService().get_ltp(instruments_to_fetch, kite)
         
         # 5. Build Chain & Calculate Delta
         
@@ -183,85 +192,48 @@ def get_option_chain(symbol: str):
         fut_symbol = greeks_service.get_next_month_futures_symbol(symbol)
         fut_key = f"NFO:{fut_symbol}"
         # Fetch future LTP too
-        fut_ltp_map = kite.fetch_ltp([fut_key])
+        fut_ltp_map = MarketDataService().get_ltp([fut_key], kite)
         F = fut_ltp_map.get(fut_key, 0)
         
         # Calculate RFR once
         T_fut = 30 / 365.0 
         r = greeks_service.calculate_risk_free_rate(underlying_ltp, F, T_fut)
         
-        # Group by strike
-        all_strikes = sorted(target_df['strike'].unique())
-        
-        # Filter for ATM +/- 10 strikes
-        # Find ATM strike (closest to underlying_ltp)
-        atm_strike = min(all_strikes, key=lambda x: abs(x - underlying_ltp))
-        atm_index = all_strikes.index(atm_strike)
-        
-        start_index = max(0, atm_index - 20)
-        end_index = min(len(all_strikes), atm_index + 21) # +21 because slice is exclusive
-        
-        strikes = all_strikes[start_index:end_index]
-        
         strike_data = []
+        legs = [] # (leg dict, 'CE'|'PE', strike) to price in one batch
         
-        today = date.today()
+        T = (nearest_expiry - today).days / 365.0
+        if T <= 0: T = 0.0001
         
-        for strike in strikes:
+        for i in window:
+            strike = float(all_strikes[i])
             strike_row = {'strike': strike}
             
-            # Find CE and PE
-            ce_row = target_df[(target_df['strike'] == strike) & (target_df['instrument_type'] == 'CE')]
-            pe_row = target_df[(target_df['strike'] == strike) & (target_df['instrument_type'] == 'PE')]
-            
-            # Process CE
-            if not ce_row.empty:
-                ce = ce_row.iloc[0]
-                key = f"NFO:{ce['tradingsymbol']}"
-                ltp = opt_ltp_map.get(key, 0)
-                
-                # Calc Delta
-                T = (nearest_expiry - today).days / 365.0
-                if T <= 0: T = 0.0001
-                
-                # IV
-                iv = greeks_service.calculate_iv(underlying_ltp, strike, T, r, ltp, 'CE')
-                sigma = iv if iv else greeks_service.default_iv
-                
-                delta = greeks_service.calculate_delta(underlying_ltp, strike, T, r, sigma, 'CE')
-                
-                strike_row['ce'] = {
-                    'symbol': ce['tradingsymbol'],
-                    'ltp': ltp,
-                    'delta': round(delta, 2),
-                    'token': int(ce['instrument_token']),
-                    'lot_size': int(ce['lot_size'])
-                }
-            
-            # Process PE
-            if not pe_row.empty:
-                pe = pe_row.iloc[0]
-                key = f"NFO:{pe['tradingsymbol']}"
-                ltp = opt_ltp_map.get(key, 0)
-                
-                # Calc Delta
-                T = (nearest_expiry - today).days / 365.0
-                if T <= 0: T = 0.0001
-                
-                iv = greeks_service.calculate_iv(underlying_ltp, strike, T, r, ltp, 'PE')
-                sigma = iv if iv else greeks_service.default_iv
-                
-                delta = greeks_service.calculate_delta(underlying_ltp, strike, T, r, sigma, 'PE')
-                
-                strike_row['pe'] = {
-                    'symbol': pe['tradingsymbol'],
-                    'ltp': ltp,
-                    'delta': round(delta, 2),
-                    'token': int(pe['instrument_token']),
-                    'lot_size': int(pe['lot_size'])
+            for side, row in (('ce', ce_legs[i]), ('pe', pe_legs[i])):
+                if row is None:
+                    continue
+                leg = {
+                    'symbol': row['tradingsymbol'],
+                    'ltp': opt_ltp_map.get(f"NFO:{row['tradingsymbol']}", 0),
+                    'delta': None,
+                    'token': row['instrument_token'],
+                    'lot_size': row['lot_size']
                 }
+                strike_row[side] = leg
+                legs.append((leg, side.upper(), strike))
                 
             strike_data.append(strike_row)
+        
+        # IV and Delta for the whole chain at once
+        if legs:
+            strikes_arr = np.array([strike for _, _, strike in legs], dtype=float)
+            prices = np.array([leg['ltp'] for leg, _, _ in legs], dtype=float)
+            types = [option_type for _, option_type, _ in legs]
+            iv = greeks_service.calculate_ivs(underlying_ltp, strikes_arr, T, r, prices, types)
+            sigma = np.where(np.isnan(iv), greeks_service.default_iv, iv)
+            deltas = greeks_service.calculate_deltas(underlying_ltp, strikes_arr, T, r, sigma, types)
+            for (leg, _, _), delta in zip(legs, deltas):
+                leg['delta'] = round(float(delta), 2)
             
         return {
             "underlying": symbol,
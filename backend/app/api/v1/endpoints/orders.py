@@ -1,18 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from app.schemas import order as schemas
-from app.services.kite_service import KiteClient
+from app.services.kite_service import KiteClient, get_kite_client
 from app.core.config import get_settings
 
 router = APIRouter()
 settings = get_settings()
 
-def get_kite_client():
-    token = KiteClient.load_access_token()
-    return KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
-
 @router.post("/place", response_model=schemas.OrderResponse)
-def place_order(order: schemas.OrderPlace):
-    kite = get_kite_client()
+def place_order(order: schemas.OrderPlace, kite: KiteClient = Depends(get_kite_client)):
     if not kite.validate_token():
         raise HTTPException(status_code=401, detail="Kite session invalid")
     
@@ -33,8 +28,7 @@ def place_order(order: schemas.OrderPlace):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/place-basket")
-def place_basket_order(orders: list[schemas.OrderPlace]):
-    kite = get_kite_client()
+def place_basket_order(orders: list[schemas.OrderPlace], kite: KiteClient = Depends(get_kite_client)):
     if not kite.validate_token():
         raise HTTPException(status_code=401, detail="Kite session invalid")
     
@@ -4,7 +4,7 @@ from typing import List, Any
 from app.core.database import get_db
 from app.repositories.trade_repository import TradeRepository
 from app.schemas import trade as schemas
-from app.services.kite_service import KiteClient
+from app.services.kite_service import KiteClient, get_kite_client
 from app.services.cost_service import CostService
 from app.core.config import get_settings
 
@@ -14,13 +14,6 @@ settings = get_settings()
 def get_repository(db: Session = Depends(get_db)):
     return TradeRepository(db)
 
-def get_kite_client():
-    # In a real app, we'd handle token management better (e.g., from DB or Redis)
-    # For now, we assume access_token is stored in a file or passed in headers (not implemented here)
-    # We'll try to load from file
-    token = KiteClient.load_access_token()
-    return KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
-
 @router.get("/", response_model=schemas.PaginatedTrades)
 def read_trades(
     skip: int = 0, 
@@ -28,9 +21,14 @@ def read_trades(
     sort_by: str = 'entry_date', 
     sort_desc: bool = True,
     status: str = None,
+    cursor: str = None,
     repo: TradeRepository = Depends(get_repository)
 ):
-    return repo.get_paginated_trades(skip=skip, limit=limit, sort_by=sort_by, sort_desc=sort_desc, status=status)
+    # cursor is the next_cursor of the previous page; when given, skip is ignored
+    try:
+        return repo.get_paginated_trades(skip=skip, limit=limit, sort_by=sort_by, sort_desc=sort_desc, status=status, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.patch("/{trade_id}", response_model=schemas.UnifiedTrade)
 def update_trade(
@@ -199,10 +197,10 @@ def add_to_basket(
 @router.post("/sync")
 def sync_trades(
     db: Session = Depends(get_db),
-    repo: TradeRepository = Depends(get_repository)
+    repo: TradeRepository = Depends(get_repository),
+    kite: KiteClient = Depends(get_kite_client)
 ):
     try:
-        kite = get_kite_client()
         if not kite.validate_token():
             print("Token validation failed")
             raise HTTPException(status_code=401, detail="Kite session invalid")
@@ -232,8 +230,9 @@ def sync_trades(
         operations = kite.process_trades(new_orders_df, db_open_trades=open_trades, db_constituents=constituents, db_closed_trades=partial_closed_trades)
         print(f"Generated {len(operations)} operations")
         
-        count = repo.apply_trade_operations(operations)
-        print(f"Applied {count} operations")
+        result = repo.apply_trade_operations_batch(operations)
+        count = result['applied']
+        print(f"Applied {count} operations in {result['elapsed_ms']} ms")
         
         # Save processed orders to Orderbook
         print("Saving processed orders...")
@@ -243,8 +242,17 @@ def sync_trades(
         print("Updating costs...")
         cost_service = CostService(db)
         cost_service.update_daily_costs(orders_df)
+
+        # Keep newly opened positions streamed
+        from app.services.market_data_service import MarketDataService
+        MarketDataService().pin_open_positions()
         
-        return {"message": "Sync completed", "operations_count": count}
+        return {
+            "message": "Sync completed",
+            "operations_count": count,
+            "operations_by_action": result['by_action'],
+            "apply_elapsed_ms": result['elapsed_ms']
+        }
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -255,11 +263,12 @@ def sync_trades(
 
 @router.post("/sync-positions")
 def sync_positions(
-    repo: TradeRepository = Depends(get_repository)
+    repo: TradeRepository = Depends(get_repository),
+    kite: KiteClient = Depends(get_kite_client)
 ):
-    kite = get_kite_client()
-    if not kite:
-        raise HTTPException(status_code=500, detail="Kite client not initialized")
+    # The shared client always exists; without a token it is not logged in
+    if not kite.access_token:
+        raise HTTPException(status_code=401, detail="Kite session invalid")
         
     try:
         # Fetch today's orders
@@ -267,6 +276,9 @@ def sync_positions(
         
         # Process orders incrementally
         count = repo.process_orders(orders_df)
+        if count:
+            from app.services.market_data_service import MarketDataService
+            MarketDataService().pin_open_positions()
         
         return {"status": "success", "message": f"Processed {count} new orders"}
     except Exception as e:
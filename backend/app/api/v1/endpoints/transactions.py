@@ -6,6 +6,8 @@ from datetime import date
 
 from app.core.database import get_db
 from app.models.all_models import Transaction
+from app.services.dashboard_cache import DashboardCache
+from app.services.ledger_service import LedgerSnapshot
 
 router = APIRouter()
 
@@ -33,6 +35,8 @@ def create_transaction(transaction: TransactionCreate, db: Session = Depends(get
     db_transaction = Transaction(**transaction.dict())
     db.add(db_transaction)
     db.commit()
+    DashboardCache().bump_version()
+    LedgerSnapshot().invalidate_transactions()
     db.refresh(db_transaction)
     return db_transaction
 
@@ -44,4 +48,6 @@ def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
     
     db.delete(transaction)
     db.commit()
+    DashboardCache().bump_version()
+    LedgerSnapshot().invalidate_transactions()
     return {"message": "Transaction deleted successfully"}
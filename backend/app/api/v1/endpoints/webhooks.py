@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
-from app.services.greeks_service import GreeksService
 import logging
 
 router = APIRouter()
@@ -20,7 +19,8 @@ def update_bond_yield(payload: BondYieldPayload = Body(...)):
         if not (0 < payload.yield_value < 20):
              raise HTTPException(status_code=400, detail="Invalid yield value. Must be between 0 and 20.")
              
-        # Update service
+        # Update service (numpy-backed; imported on first use rather than at startup)
+        from app.services.greeks_service import GreeksService
         GreeksService.set_bond_yield(payload.yield_value)
         
         logger.info(f"Received bond yield update: {payload.yield_value}")
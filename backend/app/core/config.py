@@ -16,6 +16,21 @@ class Settings(BaseSettings):
     KITE_API_KEY: str = Field(alias="ZERODHA_API_KEY")
     KITE_API_SECRET: str = Field(alias="ZERODHA_API_SECRET")
     KITE_REDIRECT_URL: str = "http://localhost:8000/api/v1/login/callback"
+
+    # Seconds a REST quote is served from cache before hitting Kite again
+    QUOTE_CACHE_TTL: float = 1.0
+
+    # Seconds a margin requirement is reused for unchanged orders/baskets
+    MARGIN_CACHE_TTL: float = 30.0
+
+    # Run Base.metadata.create_all on startup (one round trip per table); init_db.py does the same
+    CREATE_TABLES_ON_STARTUP: bool = False
+
+    # Threads for blocking DB/broker calls made by the background loops
+    BACKGROUND_IO_WORKERS: int = 4
+
+    # Seconds the dashboard equity curve (built from live account candles) is reused
+    DASHBOARD_LIVE_TTL: float = 60.0
     
 
 
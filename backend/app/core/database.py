@@ -22,3 +22,37 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def bulk_upsert(db, model, rows, index_elements, update_columns=None, update_set=None, batch_size=1000):
+    """
+    INSERT ... ON CONFLICT for a list of dicts, one statement per batch.
+    Conflicting rows get update_columns copied from the incoming row, plus any
+    update_set expressions built as fn(table, excluded). With neither given the
+    conflict is ignored (DO NOTHING). Does not commit.
+    """
+    if not rows:
+        return 0
+
+    dialect = db.bind.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"bulk_upsert is not supported on {dialect}")
+
+    # PostgreSQL rejects a statement that touches the same key twice; last row wins
+    rows = list({tuple(row[col] for col in index_elements): row for row in rows}.values())
+
+    table = model.__table__
+    for i in range(0, len(rows), batch_size):
+        stmt = insert(table).values(rows[i:i + batch_size])
+        set_ = {col: stmt.excluded[col] for col in (update_columns or [])}
+        for col, fn in (update_set or {}).items():
+            set_[col] = fn(table.c, stmt.excluded)
+        if set_:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        db.execute(stmt)
+    return len(rows)
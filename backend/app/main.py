@@ -1,12 +1,28 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import contextmanager
 from fastapi import FastAPI
 from app.core.config import get_settings
 from app.api.v1.api import api_router
 from app.core.database import engine, Base
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Milliseconds spent in each startup phase, reported at /startup
+startup_timings = {}
 
-# Create Tables (for now, usually use Alembic)
-Base.metadata.create_all(bind=engine)
+@contextmanager
+def startup_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Startup phase {name}: {startup_timings[name]} ms")
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -36,35 +52,75 @@ else:
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+startup_timings["imports"] = round((time.perf_counter() - _import_started) * 1000, 1)
 
 @app.get("/")
 def root():
     return {"message": "Trading Journal API is running"}
 
+@app.get("/event-loop")
+def event_loop_report():
+    """Event-loop lag (how late the loop wakes up) and the background I/O pool backlog."""
+    from app.services.background_io import EventLoopLagMonitor
+    return EventLoopLagMonitor().stats()
+
+@app.get("/startup")
+def startup_report():
+    """Per-phase startup timings (ms); instrument_sync appears once the background sync finishes."""
+    return startup_timings
+
+def sync_instruments_in_background():
+    """Refresh the instrument store and start the ticker; requests are served from the previous snapshot meanwhile."""
+    from app.services.instrument_service import InstrumentService, SYNC_EXCHANGES
+    from app.services.kite_service import KiteClientRegistry
+    from app.services.market_data_service import MarketDataService
+
+    with startup_phase("instrument_sync"):
+        try:
+            registry = KiteClientRegistry()
+            if registry.access_token:
+                service = InstrumentService()
+                if not service.is_fresh(SYNC_EXCHANGES):
+                    service.sync_instruments(registry.get_client())
+                # Stream LTPs for open positions, and other instruments as consumers ask for them
+                market_data = MarketDataService()
+                market_data.start(settings.KITE_API_KEY, registry.access_token)
+                market_data.pin_open_positions()
+        except Exception as e:
+            print(f"Startup sync failed (non-critical): {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    from app.services.instrument_service import InstrumentService
-    from app.services.kite_service import KiteClient
-    
-    # Initialize Service (loads cache if exists)
-    service = InstrumentService()
-    
-    # Try to sync if token exists
-    try:
-        token = KiteClient.load_access_token()
-        if token:
-            kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
-            service.sync_instruments(kite)
-    except Exception as e:
-        print(f"Startup sync failed (non-critical): {e}")
-
-    # Start Live Account Tracking
-    import asyncio
+    if settings.CREATE_TABLES_ON_STARTUP:
+        with startup_phase("create_tables"):
+            await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+
+    # Map the last synced instrument snapshot (milliseconds)
+    with startup_phase("instruments"):
+        from app.services.instrument_service import InstrumentService
+        InstrumentService()
+
+    loop = asyncio.get_running_loop()
+    app.state.instrument_sync = loop.run_in_executor(None, sync_instruments_in_background)
+
+    with startup_phase("background_tasks"):
+        from app.services.background_io import EventLoopLagMonitor
+        EventLoopLagMonitor().start()
+
+        # Start Live Account Tracking
+        from app.services.live_account_service import LiveAccountService
+        asyncio.create_task(LiveAccountService().start_tracking())
+        
+        # Start Order Monitor
+        from app.services.order_monitor_service import OrderMonitorService
+        monitor = OrderMonitorService()
+        asyncio.create_task(monitor.start_monitoring())
+
+@app.on_event("shutdown")
+async def shutdown_event():
     from app.services.live_account_service import LiveAccountService
-    # Start background tasks
-    asyncio.create_task(LiveAccountService().start_tracking())
-    
-    # Start Order Monitor
-    from app.services.order_monitor_service import OrderMonitorService
-    monitor = OrderMonitorService()
-    asyncio.create_task(monitor.start_monitoring())
+    from app.services.background_io import EventLoopLagMonitor, shutdown_executor
+    # Flush queued and in-progress account value candles
+    await LiveAccountService().stop_tracking()
+    EventLoopLagMonitor().stop()
+    shutdown_executor()
@@ -1,8 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
 
+def _keyset_index(name, column, id_column):
+    """
+    (column DESC NULLS LAST, id DESC) index. SQLite rejects NULLS LAST in an index, but it
+    sorts NULLs lowest, so a plain DESC already puts them last there.
+    """
+    return (
+        Index(name, column.desc().nulls_last(), id_column.desc()).ddl_if(dialect='postgresql'),
+        Index(name, column.desc(), id_column.desc()).ddl_if(dialect='sqlite'),
+    )
+
 class OpenTrade(Base):
     __tablename__ = "open_trades"
 
@@ -54,6 +64,22 @@ class ClosedTrade(Base):
     basket_id = Column(Integer, nullable=True) # Link to parent basket (OpenTrade ID)
     open_trade_id = Column(Integer, nullable=True) # Link to original trade cycle (OpenTrade ID):
 
+    # Keyset pagination indexes for /trades, in the page order (sort column DESC NULLS LAST,
+    # id DESC); ascending pages scan them backwards
+    __table_args__ = (
+        *_keyset_index('ix_closed_trades_entry_date_id', entry_date, id),
+        *_keyset_index('ix_closed_trades_exit_date_id', exit_date, id),
+        *_keyset_index('ix_closed_trades_pnl_id', pnl, id),
+    )
+
+class SymbolPnlSummary(Base):
+    __tablename__ = "symbol_pnl_summary"
+
+    # Running SUM(closed_trades.pnl) per symbol, maintained by TradeRepository
+    symbol = Column(String, primary_key=True)
+    realized_pnl = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
 class TradeConstituent(Base):
     __tablename__ = "trade_constituents"
     
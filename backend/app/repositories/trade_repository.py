@@ -1,12 +1,84 @@
 from sqlalchemy.orm import Session
-import pandas as pd
-from app.models.all_models import OpenTrade, ClosedTrade, DailyEquity, TradeConstituent, DailyCost, Journal, Transaction, Orderbook, DailyAccountValue, WeeklyAccountValue
-from datetime import datetime
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy import select, union_all, literal, null, cast, case, func, and_, or_, true, Float, DateTime, Date
+from app.models.all_models import OpenTrade, ClosedTrade, DailyEquity, TradeConstituent, DailyCost, Journal, Transaction, Orderbook, DailyAccountValue, WeeklyAccountValue, SymbolPnlSummary
+from app.services.dashboard_cache import DashboardCache
+from app.services.ledger_service import LedgerSnapshot
+from app.core.database import bulk_upsert
+from datetime import datetime, timedelta
+from bisect import bisect_left
+import base64
+import json
+import time
+
+class _OrderIndex:
+    """
+    Per-call lookup structure for process_orders.
+    Loads open trades and constituents once so each order is matched in memory
+    instead of issuing range queries per order.
+    """
+    DEDUP_WINDOW = timedelta(minutes=15)
+
+    def __init__(self, open_trades, constituents):
+        # (symbol, type, qty) -> sorted entry timestamps of manually entered trades
+        self._entries = {}
+        for t in list(open_trades) + list(constituents):
+            if t.entry_date is None:
+                continue
+            self._entries.setdefault((t.symbol, t.type, t.qty), []).append(t.entry_date)
+        for times in self._entries.values():
+            times.sort()
+
+        self._open_by_symbol = {}
+        for t in open_trades:
+            self._open_by_symbol.setdefault(t.symbol, t)
+
+        basket_ids = {t.id for t in open_trades if t.is_basket == 1}
+        self._basket_const_by_symbol = {}
+        self._const_by_basket = {}
+        for c in constituents:
+            if c.open_trade_id in basket_ids:
+                self._basket_const_by_symbol.setdefault(c.symbol, c)
+                self._const_by_basket.setdefault(c.open_trade_id, []).append(c)
+
+    def is_manual_duplicate(self, symbol, trade_type, qty, check_time):
+        times = self._entries.get((symbol, trade_type, qty))
+        if not times:
+            return False
+        i = bisect_left(times, check_time - self.DEDUP_WINDOW)
+        return i < len(times) and times[i] <= check_time + self.DEDUP_WINDOW
+
+    def basket_constituent(self, symbol):
+        return self._basket_const_by_symbol.get(symbol)
+
+    def open_trade(self, symbol):
+        return self._open_by_symbol.get(symbol)
+
+    def add_open_trade(self, trade):
+        self._open_by_symbol.setdefault(trade.symbol, trade)
+
+    def remove_open_trade(self, trade):
+        if self._open_by_symbol.get(trade.symbol) is trade:
+            del self._open_by_symbol[trade.symbol]
+
+    def remove_constituent(self, constituent):
+        """Drops a closed leg and returns how many legs remain in its basket."""
+        if self._basket_const_by_symbol.get(constituent.symbol) is constituent:
+            del self._basket_const_by_symbol[constituent.symbol]
+        legs = self._const_by_basket.get(constituent.open_trade_id, [])
+        if constituent in legs:
+            legs.remove(constituent)
+        return len(legs)
 
 class TradeRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _notify_trades_changed(self):
+        """Drops in-process caches derived from trades after a commit."""
+        DashboardCache().bump_version()
+        LedgerSnapshot().invalidate_trades()
+
     def get_all_open_trades(self):
         return self.db.query(OpenTrade).all()
 
@@ -35,10 +107,72 @@ class TradeRepository:
     def add_closed_trade(self, trade_data):
         trade = ClosedTrade(**trade_data)
         self.db.add(trade)
+        self.sync_symbol_pnl()
         self.db.commit()
         self.db.refresh(trade)
         return trade
 
+    def sync_symbol_pnl(self, inserted_rows=()):
+        """
+        Applies the realized PnL of pending ClosedTrade changes in the session to
+        symbol_pnl_summary, so the summary commits in the same transaction.
+        inserted_rows: ClosedTrade dicts written outside the unit of work (bulk inserts).
+        """
+        deltas = {}
+
+        def add(symbol, amount):
+            if amount:
+                deltas[symbol] = deltas.get(symbol, 0.0) + amount
+
+        for obj in self.db.new:
+            if isinstance(obj, ClosedTrade):
+                add(obj.symbol, obj.pnl or 0.0)
+        for obj in self.db.deleted:
+            if isinstance(obj, ClosedTrade):
+                add(obj.symbol, -(obj.pnl or 0.0))
+        for obj in self.db.dirty:
+            if isinstance(obj, ClosedTrade):
+                history = sa_inspect(obj).attrs.pnl.history
+                if history.added or history.deleted:
+                    old = history.deleted[0] if history.deleted else 0.0
+                    new = history.added[0] if history.added else 0.0
+                    add(obj.symbol, (new or 0.0) - (old or 0.0))
+        for row in inserted_rows:
+            add(row['symbol'], row.get('pnl') or 0.0)
+
+        if not deltas:
+            return
+        # INSERT ... ON CONFLICT (symbol) DO UPDATE adds the delta in the database, so
+        # concurrent syncs (order monitor and /trades/sync) neither lose an update nor
+        # collide on the primary key. Sorted to take row locks in a consistent order.
+        now = datetime.utcnow()
+        bulk_upsert(
+            self.db, SymbolPnlSummary,
+            [{'symbol': symbol, 'realized_pnl': deltas[symbol], 'updated_at': now} for symbol in sorted(deltas)],
+            index_elements=['symbol'],
+            update_columns=['updated_at'],
+            update_set={
+                'realized_pnl': lambda c, new: func.coalesce(c.realized_pnl, 0.0) + new.realized_pnl
+            }
+        )
+
+    def rebuild_symbol_pnl_summary(self):
+        """Recomputes symbol_pnl_summary from closed_trades (for backfills and manual edits)."""
+        try:
+            self.db.query(SymbolPnlSummary).delete()
+            rows = self.db.query(ClosedTrade.symbol, func.coalesce(func.sum(ClosedTrade.pnl), 0.0)) \
+                .filter(ClosedTrade.symbol.isnot(None)) \
+                .group_by(ClosedTrade.symbol).all()
+            now = datetime.utcnow()
+            self.db.bulk_insert_mappings(SymbolPnlSummary, [
+                {'symbol': symbol, 'realized_pnl': pnl, 'updated_at': now} for symbol, pnl in rows
+            ])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return len(rows)
+
     def apply_trade_operations(self, operations):
         count = 0
         for op in operations:
@@ -59,6 +193,7 @@ class TradeRepository:
                 if trade:
                     for key, value in updates.items():
                         setattr(trade, key, value)
+                    self.sync_symbol_pnl()
                     self.db.commit()
                     count += 1
             elif action == 'UPDATE_CONSTITUENT':
@@ -109,13 +244,135 @@ class TradeRepository:
                     self.add_closed_trade(closed_trade_data)
                     self.db.commit()
                     count += 1
+        if count:
+            self._notify_trades_changed()
         return count
 
+    def apply_trade_operations_batch(self, operations):
+        """
+        Applies the op log from KiteClient.process_trades in a single transaction.
+        Touched rows are preloaded in bulk, changes are flushed once and closed trades
+        are bulk inserted. Any failure rolls back the whole batch.
+        Returns op counts per action and elapsed time.
+        """
+        started = time.perf_counter()
+        counts = {}
+
+        symbols = {op['data']['symbol'] for op in operations if op['action'] == 'UPSERT_OPEN_TRADE'}
+        symbols |= {op['symbol'] for op in operations if op['action'] == 'DELETE_OPEN_TRADE'}
+        basket_ids = {op['id'] for op in operations if op['action'] in ('UPDATE_BASKET_ADD', 'UPDATE_BASKET_REDUCE')}
+        closed_ids = {op['id'] for op in operations if op['action'] == 'UPDATE_CLOSED_TRADE'}
+        const_ids = {op['id'] for op in operations if op['action'] == 'UPDATE_CONSTITUENT'}
+
+        try:
+            open_by_symbol = {}
+            if symbols:
+                for t in self.db.query(OpenTrade).filter(OpenTrade.symbol.in_(symbols)).order_by(OpenTrade.id):
+                    open_by_symbol.setdefault(t.symbol, []).append(t)
+            baskets = {}
+            if basket_ids:
+                baskets = {t.id: t for t in self.db.query(OpenTrade).filter(OpenTrade.id.in_(basket_ids))}
+            closed = {}
+            if closed_ids:
+                closed = {t.id: t for t in self.db.query(ClosedTrade).filter(ClosedTrade.id.in_(closed_ids))}
+            constituents = {}
+            if const_ids:
+                constituents = {c.id: c for c in self.db.query(TradeConstituent).filter(TradeConstituent.id.in_(const_ids))}
+
+            closed_rows = []
+            for op in operations:
+                action = op['action']
+                applied = True
+                if action == 'UPSERT_OPEN_TRADE':
+                    data = op['data']
+                    existing = open_by_symbol.get(data['symbol'])
+                    if existing:
+                        trade = existing[0]
+                        for key, value in data.items():
+                            setattr(trade, key, value)
+                    else:
+                        trade = OpenTrade(**data)
+                        self.db.add(trade)
+                        open_by_symbol[data['symbol']] = [trade]
+                elif action == 'DELETE_OPEN_TRADE':
+                    for trade in open_by_symbol.pop(op['symbol'], []):
+                        if trade in self.db.new:
+                            self.db.expunge(trade)
+                        else:
+                            self.db.delete(trade)
+                elif action == 'ADD_CLOSED_TRADE':
+                    closed_rows.append(op['data'])
+                elif action == 'UPDATE_CLOSED_TRADE':
+                    trade = closed.get(op['id'])
+                    applied = trade is not None
+                    if trade:
+                        for key, value in op['data'].items():
+                            setattr(trade, key, value)
+                elif action == 'UPDATE_CONSTITUENT':
+                    constituent = constituents.get(op['id'])
+                    applied = constituent is not None
+                    if constituent:
+                        for key, value in op['data'].items():
+                            setattr(constituent, key, value)
+                elif action == 'UPDATE_BASKET_ADD':
+                    basket = baskets.get(op['id'])
+                    applied = basket is not None
+                    if basket:
+                        basket.avg_price += op['amount']
+                        basket.max_exposure = max(basket.max_exposure, int(basket.avg_price))
+                elif action == 'UPDATE_BASKET_REDUCE':
+                    basket = baskets.get(op['id'])
+                    applied = basket is not None
+                    if basket:
+                        pnl_realized = op['pnl_realized']
+                        basket.avg_price -= op['cost_removed']
+                        basket.realized_pnl = (basket.realized_pnl or 0.0) + pnl_realized
+                        closed_rows.append({
+                            'symbol': basket.symbol,
+                            'instrument_token': 0,
+                            'qty': 0,
+                            'entry_price': 0,
+                            'exit_price': 0,
+                            'entry_date': basket.entry_date,
+                            'exit_date': datetime.now(),
+                            'pnl': pnl_realized,
+                            'type': 'BASKET',
+                            'exchange': 'MULTI',
+                            'closure_type': 'PARTIAL_BASKET',
+                            'product': 'MIS',
+                            'strategy_type': basket.strategy_type,
+                            'is_basket': 1,
+                            'basket_id': basket.id
+                        })
+                else:
+                    applied = False
+
+                if applied:
+                    counts[action] = counts.get(action, 0) + 1
+
+            self.sync_symbol_pnl(inserted_rows=closed_rows)
+            self.db.flush()
+            if closed_rows:
+                self.db.bulk_insert_mappings(ClosedTrade, closed_rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if counts:
+            self._notify_trades_changed()
+
+        return {
+            "applied": sum(counts.values()),
+            "by_action": counts,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
     def process_orders(self, orders_df):
         """
         Syncs orders from Zerodha to local DB incrementally.
         Handles new orders to update open/closed trades.
         """
+        import pandas as pd
         if orders_df.empty:
             return 0
             
@@ -129,6 +386,12 @@ class TradeRepository:
             flat[0] for flat in self.db.query(Orderbook.order_id).all()
         )
         
+        # Load open trades and constituents once for dedup and position lookups
+        index = _OrderIndex(
+            self.db.query(OpenTrade).order_by(OpenTrade.id).all(),
+            self.db.query(TradeConstituent).order_by(TradeConstituent.id).all()
+        )
+        
         # 3. Process new orders
         count = 0
         # Sort by timestamp to process in order
@@ -163,37 +426,10 @@ class TradeRepository:
             # Dedup Check: Check if this order was already manually entered
             # We look for a trade with same Symbol, Type, Qty, and approx Time (within 15 mins)
             # This prevents double-counting if the user manually added the trade before syncing
-            
-            is_duplicate = False
-            time_window = timedelta(minutes=15)
             check_type = 'LONG' if row['transaction_type'] == 'BUY' else 'SHORT'
-            check_time = row['order_timestamp']
-            
-            # Check OpenTrades
-            existing_trade = self.db.query(OpenTrade).filter(
-                OpenTrade.symbol == row['tradingsymbol'],
-                OpenTrade.type == check_type,
-                OpenTrade.qty == row['quantity'],
-                OpenTrade.entry_date >= check_time - time_window,
-                OpenTrade.entry_date <= check_time + time_window
-            ).first()
+            check_time = row['order_timestamp'].to_pydatetime()
             
-            if existing_trade:
-                is_duplicate = True
-                
-            # Check Constituents
-            if not is_duplicate:
-                existing_const = self.db.query(TradeConstituent).filter(
-                    TradeConstituent.symbol == row['tradingsymbol'],
-                    TradeConstituent.type == check_type,
-                    TradeConstituent.qty == row['quantity'],
-                    TradeConstituent.entry_date >= check_time - time_window,
-                    TradeConstituent.entry_date <= check_time + time_window
-                ).first()
-                if existing_const:
-                    is_duplicate = True
-            
-            if is_duplicate:
+            if index.is_manual_duplicate(row['tradingsymbol'], check_type, int(row['quantity']), check_time):
                 print(f"Skipping duplicate manual trade for order {order_id}")
                 # We still add it to Orderbook (done above) so we don't re-process it
                 # But we skip the trade logic
@@ -205,12 +441,8 @@ class TradeRepository:
             price = row['average_price']
             txn_type = row['transaction_type'] # BUY or SELL
             
-            # Check if this is a constituent of a basket
-            # We join with OpenTrade to ensure we get the active basket
-            constituent = self.db.query(TradeConstituent).join(OpenTrade).filter(
-                TradeConstituent.symbol == symbol, 
-                OpenTrade.is_basket == 1
-            ).first()
+            # Check if this is a constituent of an active basket
+            constituent = index.basket_constituent(symbol)
             
             if constituent:
                 # Handle Basket Constituent Logic
@@ -316,12 +548,7 @@ class TradeRepository:
                         self.db.delete(constituent)
                         
                         # Check if Basket is empty
-                        # We need to flush/commit to see the deletion? Or check count - 1
-                        # Safe way: Check if this was the last constituent
-                        remaining_constituents = self.db.query(TradeConstituent).filter(
-                            TradeConstituent.open_trade_id == basket.id,
-                            TradeConstituent.id != constituent.id
-                        ).count()
+                        remaining_constituents = index.remove_constituent(constituent)
                         
                         if remaining_constituents == 0:
                             # Close the Basket Trade itself
@@ -354,6 +581,7 @@ class TradeRepository:
                             )
                             self.db.add(basket_closed)
                             self.db.delete(basket)
+                            index.remove_open_trade(basket)
                     
                     else:
                         # Flip logic for constituent? 
@@ -392,6 +620,7 @@ class TradeRepository:
                         cost_removed = constituent.qty * constituent.avg_price
                         basket.avg_price -= cost_removed
                         self.db.delete(constituent)
+                        index.remove_constituent(constituent)
                         
                         # 2. New Standalone Trade for remainder
                         remaining_qty = qty - constituent.qty
@@ -412,10 +641,14 @@ class TradeRepository:
                             is_basket=0
                         )
                         self.db.add(new_trade)
+                        index.add_open_trade(new_trade)
+
+                count += 1
+                continue
 
             else:
                 # Check for existing open trade
-                open_trade = self.db.query(OpenTrade).filter(OpenTrade.symbol == symbol).first()
+                open_trade = index.open_trade(symbol)
             
             if not open_trade:
                 # New Position
@@ -443,6 +676,7 @@ class TradeRepository:
                     is_basket=0
                 )
                 self.db.add(new_trade)
+                index.add_open_trade(new_trade)
             else:
                 # Existing Position - Update Logic
                 is_same_side = (open_trade.type == 'LONG' and txn_type == 'BUY') or \
@@ -519,6 +753,7 @@ class TradeRepository:
                         )
                         self.db.add(closed_trade)
                         self.db.delete(open_trade)
+                        index.remove_open_trade(open_trade)
                         
                     else:
                         # Flip (Close current + Open new opposite)
@@ -550,6 +785,7 @@ class TradeRepository:
                         )
                         self.db.add(closed_trade)
                         self.db.delete(open_trade)
+                        index.remove_open_trade(open_trade)
                         
                         # 2. Open new opposite
                         remaining_qty = qty - close_qty
@@ -570,48 +806,44 @@ class TradeRepository:
                             is_basket=0
                         )
                         self.db.add(new_trade)
+                        index.add_open_trade(new_trade)
             
             count += 1
             
+        self.sync_symbol_pnl()
         self.db.commit()
+        if count:
+            self._notify_trades_changed()
         return count
 
     def save_daily_equity(self, date, account_value, realized_pnl, unrealized_pnl, total_capital, 
                           nifty50=None, nifty_midcap150=None, nifty_smallcap250=None,
                           open=None, high=None, low=None):
-        session = self.db
+        row = {
+            'date': date,
+            'account_value': account_value,
+            'realized_pnl': realized_pnl,
+            'unrealized_pnl': unrealized_pnl,
+            'total_capital': total_capital,
+            'nifty50': nifty50,
+            'nifty_midcap150': nifty_midcap150,
+            'nifty_smallcap250': nifty_smallcap250,
+            'open': open if open is not None else account_value,
+            'high': high if high is not None else account_value,
+            'low': low if low is not None else account_value
+        }
+        # Optional fields only overwrite an existing row when they were passed
+        optional = {
+            'nifty50': nifty50, 'nifty_midcap150': nifty_midcap150, 'nifty_smallcap250': nifty_smallcap250,
+            'open': open, 'high': high, 'low': low
+        }
+        update_columns = ['account_value', 'realized_pnl', 'unrealized_pnl', 'total_capital']
+        update_columns += [col for col, value in optional.items() if value is not None]
         try:
-            entry = session.query(DailyEquity).filter_by(date=date).first()
-            if entry:
-                entry.account_value = account_value
-                entry.realized_pnl = realized_pnl
-                entry.unrealized_pnl = unrealized_pnl
-                entry.total_capital = total_capital
-                if nifty50 is not None: entry.nifty50 = nifty50
-                if nifty_midcap150 is not None: entry.nifty_midcap150 = nifty_midcap150
-                if nifty_smallcap250 is not None: entry.nifty_smallcap250 = nifty_smallcap250
-                if open is not None: entry.open = open
-                if high is not None: entry.high = high
-                if low is not None: entry.low = low
-            else:
-                entry = DailyEquity(
-                    date=date,
-                    account_value=account_value,
-                    realized_pnl=realized_pnl,
-                    unrealized_pnl=unrealized_pnl,
-                    total_capital=total_capital,
-                    nifty50=nifty50,
-                    nifty_midcap150=nifty_midcap150,
-                    nifty_smallcap250=nifty_smallcap250,
-                    open=open if open is not None else account_value,
-                    high=high if high is not None else account_value,
-                    low=low if low is not None else account_value
-                )
-                session.add(entry)
-            session.commit()
-            session.refresh(entry)
+            bulk_upsert(self.db, DailyEquity, [row], index_elements=['date'], update_columns=update_columns)
+            self.db.commit()
         except Exception as e:
-            session.rollback()
+            self.db.rollback()
             raise e
 
     def get_daily_equity_history(self):
@@ -621,12 +853,14 @@ class TradeRepository:
         open_trades = self.db.query(OpenTrade).all()
         closed_trades = self.db.query(ClosedTrade).all()
         
-        # Calculate Realized PnL per symbol
+        # Realized PnL per symbol, for open symbols only
+        open_symbols = {t.symbol for t in open_trades}
         realized_pnl_map = {}
-        for t in closed_trades:
-            if t.symbol not in realized_pnl_map:
-                realized_pnl_map[t.symbol] = 0.0
-            realized_pnl_map[t.symbol] += (t.pnl or 0.0)
+        if open_symbols:
+            realized_pnl_map = dict(
+                self.db.query(SymbolPnlSummary.symbol, SymbolPnlSummary.realized_pnl)
+                .filter(SymbolPnlSummary.symbol.in_(open_symbols))
+            )
         
         unified = []
         
@@ -665,7 +899,7 @@ class TradeRepository:
             if getattr(t, 'is_basket', 0) == 1:
                 r_pnl = getattr(t, 'realized_pnl', 0.0)
             else:
-                r_pnl = realized_pnl_map.get(t.symbol, 0.0)
+                r_pnl = realized_pnl_map.get(t.symbol) or 0.0
                 
             unified.append({
                 'id': f"OPEN_{t.id}",
@@ -710,34 +944,235 @@ class TradeRepository:
             
         return unified
 
-    def get_paginated_trades(self, skip: int = 0, limit: int = 100, sort_by: str = 'entry_date', sort_desc: bool = True, status: str = None):
-        all_trades = self.get_unified_trades()
-        
-        # Filter
+    SORTABLE_COLUMNS = ('entry_date', 'exit_date', 'pnl', 'entry_price')
+    # Statuses each union arm can produce, by source_rank (closed arm first)
+    ARM_STATUSES = (('CLOSED', 'PARTIAL'), ('OPEN',))
+
+    def _unified_trades_subquery(self):
+        """
+        Closed and open trades projected into the UnifiedTrade shape as a single UNION ALL,
+        so filtering, sorting and pagination can run in the database.
+        """
+        return union_all(*self._unified_trades_arms()).subquery('unified_trades')
+
+    def _unified_trades_arms(self):
+        """The closed and open arms of the unified trades union, by source_rank."""
+        closed = select(
+            ClosedTrade.id.label('original_id'),
+            literal('CLOSED').label('source_table'),
+            literal(0).label('source_rank'),
+            ClosedTrade.symbol.label('trading_symbol'),
+            ClosedTrade.instrument_token,
+            ClosedTrade.exchange,
+            ClosedTrade.product.label('order_type'),
+            ClosedTrade.entry_date,
+            ClosedTrade.exit_date,
+            ClosedTrade.qty,
+            ClosedTrade.entry_price,
+            ClosedTrade.exit_price,
+            ClosedTrade.pnl,
+            case((ClosedTrade.closure_type.like('%PARTIAL%'), 'PARTIAL'), else_='CLOSED').label('status'),
+            ClosedTrade.is_mtf,
+            ClosedTrade.setup_used,
+            ClosedTrade.mistakes_made,
+            ClosedTrade.notes,
+            ClosedTrade.screenshot_path,
+            ClosedTrade.type,
+            ClosedTrade.strategy_type,
+            func.coalesce(ClosedTrade.is_basket, 0).label('is_basket'),
+            ClosedTrade.closure_type,
+            cast(null(), Float).label('stop_loss'),
+            literal(0.0, Float).label('realized_pnl')
+        )
+
+        # Realized PnL of earlier cycles of the same symbol (baskets track their own)
+        symbol_realized = select(SymbolPnlSummary.realized_pnl).where(
+            SymbolPnlSummary.symbol == OpenTrade.symbol
+        ).correlate(OpenTrade).scalar_subquery()
+
+        open_ = select(
+            OpenTrade.id.label('original_id'),
+            literal('OPEN').label('source_table'),
+            literal(1).label('source_rank'),
+            OpenTrade.symbol.label('trading_symbol'),
+            OpenTrade.instrument_token,
+            OpenTrade.exchange,
+            OpenTrade.product.label('order_type'),
+            OpenTrade.entry_date,
+            cast(null(), DateTime).label('exit_date'),
+            OpenTrade.qty,
+            OpenTrade.avg_price.label('entry_price'),
+            cast(null(), Float).label('exit_price'),
+            literal(0.0, Float).label('pnl'),
+            literal('OPEN').label('status'),
+            OpenTrade.is_mtf,
+            OpenTrade.setup_used,
+            OpenTrade.mistakes_made,
+            OpenTrade.notes,
+            OpenTrade.screenshot_path,
+            OpenTrade.type,
+            OpenTrade.strategy_type,
+            func.coalesce(OpenTrade.is_basket, 0).label('is_basket'),
+            cast(null(), OpenTrade.symbol.type).label('closure_type'),
+            OpenTrade.stop_loss,
+            case(
+                (OpenTrade.is_basket == 1, func.coalesce(OpenTrade.realized_pnl, 0.0)),
+                else_=func.coalesce(symbol_realized, 0.0)
+            ).label('realized_pnl')
+        )
+
+        return closed, open_
+
+    def _encode_cursor(self, sort_by, sort_desc, row):
+        value = row[sort_by] if sort_by in self.SORTABLE_COLUMNS else None
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = {'s': sort_by, 'd': sort_desc, 'v': value, 'r': row['source_rank'], 'i': row['original_id']}
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+    def _decode_cursor(self, cursor, sort_by, sort_desc):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            value = payload['v']
+            if value is not None and sort_by.endswith('date'):
+                value = datetime.fromisoformat(value)
+            position = (value, int(payload['r']), int(payload['i']))
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+        if payload['s'] != sort_by or payload['d'] != sort_desc:
+            raise ValueError("Cursor does not match the requested sort")
+        return position
+
+    def _page_order(self, table, sort_by, sort_desc, by_rank=True):
+        """
+        Page order: sort column (missing values lowest), then closed before open, then id
+        in the sort direction, so one (column DESC NULLS LAST, id DESC) index serves both.
+        """
+        order_by = []
+        ids_desc = sort_by in self.SORTABLE_COLUMNS and sort_desc
+        if sort_by in self.SORTABLE_COLUMNS:
+            column = table.c[sort_by]
+            order_by.append(column.desc().nulls_last() if sort_desc else column.asc().nulls_first())
+        if by_rank:
+            order_by.append(table.c.source_rank)
+        order_by.append(table.c.original_id.desc() if ids_desc else table.c.original_id.asc())
+        return order_by
+
+    def _seek_ranges(self, arm, rank, sort_by, sort_desc, position):
+        """
+        Conditions selecting the rows of one union arm that come after `position`, each a
+        single range of the arm's keyset index (an OR of them could not be an index bound).
+        """
+        value, cursor_rank, trade_id = position
+        ids = arm.c.original_id
+        # Rows sharing the cursor's sort value: all, none or some, depending on the arm
+        if rank > cursor_rank:
+            ties = true()
+        elif rank == cursor_rank:
+            ids_desc = sort_by in self.SORTABLE_COLUMNS and sort_desc
+            ties = ids < trade_id if ids_desc else ids > trade_id
+        else:
+            ties = None
+
+        if sort_by not in self.SORTABLE_COLUMNS:
+            return [] if ties is None else [ties]
+
+        column = arm.c[sort_by]
+        ranges = []
+        if ties is not None:
+            ranges.append(and_(column.is_(None) if value is None else column == value, ties))
+        # Nulls sort last when descending, first when ascending
+        if value is None:
+            if not sort_desc:
+                ranges.append(column.isnot(None))
+        else:
+            ranges.append(column < value if sort_desc else column > value)
+            if sort_desc:
+                ranges.append(column.is_(None))
+        return ranges
+
+    def get_paginated_trades(self, skip: int = 0, limit: int = 100, sort_by: str = 'entry_date', sort_desc: bool = True, status: str = None, cursor: str = None):
+        """
+        Returns a page of unified trades.
+        With `cursor` (the `next_cursor` of the previous page) the page is located with a
+        seek predicate on (sort_by, id), `skip` is ignored and `page` is None.
+
+        Each union arm (and, after a cursor, each index range of it) is ordered and limited
+        on its own, so the database reads it straight off the keyset index; only those few
+        rows are merged and sorted into the page.
+        """
+        position = self._decode_cursor(cursor, sort_by, sort_desc) if cursor else None
+        if position:
+            skip = 0
+        wanted = ('CLOSED', 'PARTIAL') if status == 'CLOSED' else (status,)
+
+        pieces = []
+        for rank, arm in enumerate(self._unified_trades_arms()):
+            statuses = self.ARM_STATUSES[rank]
+            if status and not set(wanted) & set(statuses):
+                continue
+            arm = arm.subquery()
+            conditions = []
+            if status and not set(statuses) <= set(wanted):
+                conditions.append(arm.c.status.in_(wanted))
+            ranges = self._seek_ranges(arm, rank, sort_by, sort_desc, position) if position else [true()]
+            for seek in ranges:
+                piece = (
+                    select(arm)
+                    .where(*conditions, seek)
+                    .order_by(*self._page_order(arm, sort_by, sort_desc, by_rank=False))
+                    # One extra row to know whether another page exists
+                    .limit(skip + limit + 1)
+                )
+                pieces.append(select(piece.subquery()))
+
+        rows = []
+        if pieces:
+            merged = union_all(*pieces).subquery('page')
+            query = select(merged).order_by(*self._page_order(merged, sort_by, sort_desc)).offset(skip).limit(limit + 1)
+            rows = self.db.execute(query).mappings().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(sort_by, sort_desc, rows[-1])
+
+        unified = self._unified_trades_subquery()
+        count_query = select(func.count()).select_from(unified)
         if status:
-            if status == 'CLOSED':
-                all_trades = [t for t in all_trades if t['status'] in ['CLOSED', 'PARTIAL']]
-            else:
-                all_trades = [t for t in all_trades if t['status'] == status]
-            
-        # Sort
-        reverse = sort_desc
-        if sort_by in ['entry_date', 'exit_date', 'pnl', 'entry_price']:
-            def sort_key(x):
-                val = x.get(sort_by)
-                if val is None:
-                    return datetime.min if sort_by.endswith('date') else float('-inf')
-                return val
-            all_trades.sort(key=sort_key, reverse=reverse)
-            
-        total = len(all_trades)
-        paginated = all_trades[skip : skip + limit]
-        
+            count_query = count_query.where(unified.c.status.in_(wanted))
+        total = self.db.execute(count_query).scalar()
+        basket_ids = [r['original_id'] for r in rows if r['source_table'] == 'OPEN' and r['is_basket'] == 1]
+        constituents_by_basket = {}
+        if basket_ids:
+            for c in self.db.query(TradeConstituent).filter(TradeConstituent.open_trade_id.in_(basket_ids)):
+                constituents_by_basket.setdefault(c.open_trade_id, []).append({
+                    'id': c.id,
+                    'symbol': c.symbol,
+                    'instrument_token': c.instrument_token,
+                    'qty': c.qty,
+                    'avg_price': c.avg_price,
+                    'entry_date': c.entry_date,
+                    'exchange': c.exchange,
+                    'product': c.product,
+                    'type': c.type
+                })
+
+        paginated = []
+        for r in rows:
+            trade = dict(r)
+            del trade['source_rank']
+            trade['id'] = f"{r['source_table']}_{r['original_id']}"
+            trade['segment'] = 'EQ'
+            if r['source_table'] == 'OPEN':
+                trade['constituents'] = constituents_by_basket.get(r['original_id'], [])
+            paginated.append(trade)
+
         return {
             "data": paginated,
             "total": total,
-            "page": (skip // limit) + 1,
-            "page_size": limit
+            "page": None if position else (skip // limit) + 1,
+            "page_size": limit,
+            "next_cursor": next_cursor
         }
 
     def update_trade(self, composite_id: str, updates: dict):
@@ -757,6 +1192,7 @@ class TradeRepository:
                 if hasattr(trade, key):
                     setattr(trade, key, value)
             self.db.commit()
+            self._notify_trades_changed()
             self.db.refresh(trade)
         return trade
 
@@ -852,6 +1288,7 @@ class TradeRepository:
             self.db.delete(t)
             
         self.db.commit()
+        self._notify_trades_changed()
         self.db.refresh(basket_trade)
         return basket_trade
 
@@ -925,6 +1362,7 @@ class TradeRepository:
             self.db.delete(t)
             
         self.db.commit()
+        self._notify_trades_changed()
         self.db.refresh(basket)
         return basket
 
@@ -943,105 +1381,127 @@ class TradeRepository:
 
     def save_orders(self, orders_df):
         """Bulk saves orders to the Orderbook table."""
+        import pandas as pd
         if orders_df.empty:
             return
             
         orders_to_add = []
         for _, row in orders_df.iterrows():
-            # Check if order already exists (double check)
-            existing = self.db.query(Orderbook).filter(Orderbook.order_id == row['order_id']).first()
-            if existing:
-                continue
-                
-            order = Orderbook(
-                order_id=row['order_id'],
-                exchange_order_id=row.get('exchange_order_id'),
-                status=row['status'],
-                order_timestamp=pd.to_datetime(row['order_timestamp']),
-                exchange_timestamp=pd.to_datetime(row.get('exchange_timestamp')) if row.get('exchange_timestamp') else None,
-                transaction_type=row['transaction_type'],
-                tradingsymbol=row['tradingsymbol'],
-                instrument_token=row['instrument_token'],
-                product=row['product'],
-                quantity=row['quantity'],
-                average_price=row['average_price'],
-                filled_quantity=row['filled_quantity'],
-                pending_quantity=row['pending_quantity'],
-                cancelled_quantity=row['cancelled_quantity'],
-                parent_order_id=row.get('parent_order_id'),
-                tag=row.get('tag')
-            )
-            orders_to_add.append(order)
+            orders_to_add.append({
+                'order_id': row['order_id'],
+                'exchange_order_id': row.get('exchange_order_id'),
+                'status': row['status'],
+                'order_timestamp': pd.to_datetime(row['order_timestamp']),
+                'exchange_timestamp': pd.to_datetime(row.get('exchange_timestamp')) if row.get('exchange_timestamp') else None,
+                'transaction_type': row['transaction_type'],
+                'tradingsymbol': row['tradingsymbol'],
+                'instrument_token': row['instrument_token'],
+                'product': row['product'],
+                'quantity': row['quantity'],
+                'average_price': row['average_price'],
+                'filled_quantity': row['filled_quantity'],
+                'pending_quantity': row['pending_quantity'],
+                'cancelled_quantity': row['cancelled_quantity'],
+                'parent_order_id': row.get('parent_order_id'),
+                'tag': row.get('tag')
+            })
             
+        # Orders already in the book are left untouched
         if orders_to_add:
-            self.db.add_all(orders_to_add)
+            bulk_upsert(self.db, Orderbook, orders_to_add, index_elements=['order_id'])
             self.db.commit()
 
-    def get_daily_ohlc_from_candles(self):
-        """Aggregates AccountValue into daily OHLC."""
-        from sqlalchemy import func, cast, Date
-        from app.models.all_models import AccountValue
-        
-        # We need to group by date(timestamp)
-        # SQLite: date(timestamp)
-        # Postgres: cast(timestamp as Date)
-        # Since we are using SQLite (based on previous errors), we use func.date
-        
-        # Actually, let's try a generic approach or check dialect
-        # For now assuming SQLite as per previous 'sqlite3' command usage attempt
-        
-        # Query: Date, Open (first), High (max), Low (min), Close (last)
-        # Getting first/last in SQL group by is tricky without window functions.
-        # Simpler approach: Fetch all candles and aggregate in Python (pandas) since dataset is small (146 rows).
-        
-        candles = self.db.query(AccountValue).all()
-        if not candles:
-            return {}
-            
-        data = []
-        for c in candles:
-            data.append({
-                'timestamp': c.timestamp,
-                'open': c.open,
-                'high': c.high,
-                'low': c.low,
-                'close': c.close
-            })
-            
-        df = pd.DataFrame(data)
-        df['date'] = df['timestamp'].dt.date
-        
-        daily = df.groupby('date').agg({
-            'open': 'first',
-            'high': 'max',
-            'low': 'min',
-            'close': 'last'
-        }).reset_index()
-        
-        # Convert to dict: {date_obj: {open, high, low, close}}
+    def get_daily_ohlc_from_candles(self, start_date=None, end_date=None):
+        """
+        Daily OHLC of the account value as {date: {open, high, low, close}}, optionally
+        limited to [start_date, end_date].
+        Days before the aggregation watermark are read from daily_account_values; the
+        remaining days are rolled up from AccountValue candles in SQL.
+        """
+        from app.models.all_models import AccountValue, DailyAccountValue
+
         result = {}
-        for _, row in daily.iterrows():
-            result[row['date']] = {
-                'open': row['open'],
-                'high': row['high'],
-                'low': row['low'],
-                'close': row['close']
-            }
+
+        # Rollup rows before the watermark day are final (see aggregate_account_values)
+        watermark = self.db.query(func.max(DailyAccountValue.date)).scalar()
+        if watermark is not None and (start_date is None or start_date < watermark):
+            query = self.db.query(DailyAccountValue).filter(DailyAccountValue.date < watermark)
+            if start_date is not None:
+                query = query.filter(DailyAccountValue.date >= start_date)
+            if end_date is not None:
+                query = query.filter(DailyAccountValue.date <= end_date)
+            for r in query.order_by(DailyAccountValue.date):
+                result[r.date] = {'open': r.open, 'high': r.high, 'low': r.low, 'close': r.close}
+
+        candle_start = start_date
+        if watermark is not None and (candle_start is None or candle_start < watermark):
+            candle_start = watermark
+        if end_date is not None and candle_start is not None and candle_start > end_date:
+            return result
+
+        if self.db.bind.dialect.name == 'postgresql':
+            day = cast(func.date_trunc('day', AccountValue.timestamp), Date)
+        else:
+            day = func.date(AccountValue.timestamp)
+
+        candles = select(
+            day.label('day'),
+            AccountValue.high,
+            AccountValue.low,
+            func.first_value(AccountValue.open).over(
+                partition_by=day, order_by=AccountValue.timestamp
+            ).label('open'),
+            func.last_value(AccountValue.close).over(
+                partition_by=day, order_by=AccountValue.timestamp, rows=(None, None)
+            ).label('close')
+        )
+        if candle_start is not None:
+            candles = candles.where(AccountValue.timestamp >= datetime.combine(candle_start, datetime.min.time()))
+        if end_date is not None:
+            candles = candles.where(AccountValue.timestamp < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        candles = candles.subquery()
+
+        # open/close are constant within a day, so any aggregate picks them
+        daily = select(
+            candles.c.day,
+            func.min(candles.c.open),
+            func.max(candles.c.high),
+            func.min(candles.c.low),
+            func.min(candles.c.close)
+        ).group_by(candles.c.day).order_by(candles.c.day)
+
+        for day_value, open_, high, low, close in self.db.execute(daily):
+            if isinstance(day_value, str):
+                day_value = datetime.strptime(day_value, '%Y-%m-%d').date()
+            result[day_value] = {'open': open_, 'high': high, 'low': low, 'close': close}
             
         return result
 
-    def aggregate_account_values(self):
+    def aggregate_account_values(self, full: bool = False):
         """
         Aggregates AccountValue records into DailyAccountValue and WeeklyAccountValue tables.
         This implements the Lambda Architecture batch layer.
+
+        Incremental by default: the watermark is the latest aggregated day, and only
+        candles from the start of that day's week onwards are read, so every bucket that
+        can still change (the open day and the open week) is recomputed and older ones are
+        left alone. Pass full=True to rebuild from the whole history.
         """
+        import pandas as pd
         from app.models.all_models import AccountValue, DailyAccountValue, WeeklyAccountValue
-        from sqlalchemy import func
         
-        # 1. Fetch all raw data (for now, in production we might filter by last aggregation time)
-        raw_data = self.db.query(AccountValue).order_by(AccountValue.timestamp).all()
+        # 1. Fetch raw data since the watermark
+        query = self.db.query(AccountValue)
+        since = None
+        if not full:
+            watermark = self.db.query(func.max(DailyAccountValue.date)).scalar()
+            if watermark is not None:
+                # Weekly buckets start on Monday
+                since = watermark - timedelta(days=watermark.weekday())
+                query = query.filter(AccountValue.timestamp >= datetime.combine(since, datetime.min.time()))
+        raw_data = query.order_by(AccountValue.timestamp).all()
         if not raw_data:
-            return {"daily": 0, "weekly": 0}
+            return {"daily": 0, "weekly": 0, "since": since}
             
         # 2. Process in Python (Pandas is easier for resampling)
         df = pd.DataFrame([{
@@ -1073,20 +1533,10 @@ class TradeRepository:
                 'close': float(row['close'])
             })
             
-        # Bulk Upsert Daily
-        # SQLAlchemy doesn't have a native cross-db bulk upsert, so we'll do delete-insert for simplicity 
-        # or merge one by one. Merge is safer.
-        daily_count = 0
-        for obj in daily_objects:
-            existing = self.db.query(DailyAccountValue).filter(DailyAccountValue.date == obj['date']).first()
-            if existing:
-                existing.open = obj['open']
-                existing.high = obj['high']
-                existing.low = obj['low']
-                existing.close = obj['close']
-            else:
-                self.db.add(DailyAccountValue(**obj))
-            daily_count += 1
+        daily_count = bulk_upsert(
+            self.db, DailyAccountValue, daily_objects,
+            index_elements=['date'], update_columns=['open', 'high', 'low', 'close']
+        )
             
         # --- Weekly Aggregation ---
         # Resample 'W-MON' (Weekly starting Monday)
@@ -1107,17 +1557,10 @@ class TradeRepository:
                 'close': float(row['close'])
             })
             
-        weekly_count = 0
-        for obj in weekly_objects:
-            existing = self.db.query(WeeklyAccountValue).filter(WeeklyAccountValue.week_start_date == obj['week_start_date']).first()
-            if existing:
-                existing.open = obj['open']
-                existing.high = obj['high']
-                existing.low = obj['low']
-                existing.close = obj['close']
-            else:
-                self.db.add(WeeklyAccountValue(**obj))
-            weekly_count += 1
+        weekly_count = bulk_upsert(
+            self.db, WeeklyAccountValue, weekly_objects,
+            index_elements=['week_start_date'], update_columns=['open', 'high', 'low', 'close']
+        )
             
         self.db.commit()
-        return {"daily": daily_count, "weekly": weekly_count}
+        return {"daily": daily_count, "weekly": weekly_count, "since": since}
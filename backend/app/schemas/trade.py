@@ -122,5 +122,6 @@ class BasketAdd(BaseModel):
 class PaginatedTrades(BaseModel):
     data: List[UnifiedTrade]
     total: int
-    page: int
+    page: Optional[int] = None
     page_size: int
+    next_cursor: Optional[str] = None
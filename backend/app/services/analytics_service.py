@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from app.services.charges_service import ChargesService
 
 class AnalyticsService:
     def __init__(self, trades: list):
@@ -17,17 +18,16 @@ class AnalyticsService:
             self.df['entry_date'] = pd.to_datetime(self.df['entry_date'])
             self.df['exit_date'] = pd.to_datetime(self.df['exit_date'])
             
-            self.df['days_held'] = (self.df['exit_date'] - self.df['entry_date']).dt.days
-            self.df['days_held'] = self.df['days_held'].apply(lambda x: max(x, 1))
+            # Minimum holding of 1 day (open trades keep NaN)
+            self.df['days_held'] = (self.df['exit_date'] - self.df['entry_date']).dt.days.clip(lower=1)
             
-            def calculate_mtf_interest(row):
-                if row.get('is_mtf', 0) == 1:
-                    principal = row['entry_price'] * row['qty']
-                    interest = (principal * 0.18 * row['days_held']) / 365
-                    return interest
-                return 0
-            
-            self.df['mtf_interest'] = self.df.apply(calculate_mtf_interest, axis=1)
+            # MTF interest at 18% p.a. on the entry principal
+            if 'is_mtf' in self.df.columns:
+                principal = self.df['entry_price'] * self.df['qty']
+                interest = (principal * 0.18 * self.df['days_held']) / 365
+                self.df['mtf_interest'] = np.where(self.df['is_mtf'] == 1, interest, 0.0)
+            else:
+                self.df['mtf_interest'] = 0.0
             self.df['net_pnl'] = self.df['pnl'] - self.df['mtf_interest']
         else:
             self.df['net_pnl'] = []
@@ -118,13 +118,10 @@ class AnalyticsService:
         if closed_trades.empty:
             return []
             
-        def calculate_return_pct(row):
-            invested = row['entry_price'] * row['qty']
-            if invested == 0:
-                return 0
-            return (row['net_pnl'] / invested) * 100
-            
-        return closed_trades.apply(calculate_return_pct, axis=1).fillna(0).tolist()
+        # Return on invested capital; zero investment maps to 0
+        invested = (closed_trades['entry_price'] * closed_trades['qty']).replace(0, np.nan)
+        return_pct = (closed_trades['net_pnl'] / invested) * 100
+        return return_pct.fillna(0).tolist()
 
     def get_monthly_heatmap(self):
         if self.df.empty:
@@ -156,113 +153,91 @@ class AnalyticsService:
         stats = stats.sort_values('month_year', ascending=False)
         return stats
 
-    def calculate_costs(self, row):
-        segment = row['segment']
-        entry_price = row['entry_price']
-        exit_price = row['exit_price']
-        qty = row['qty']
-        
-        # Handle open trades where exit_price might be None
-        if pd.isna(exit_price) or exit_price is None:
-            exit_price = entry_price # Estimate using entry price
-            
-        turnover = (entry_price + exit_price) * qty
-        
-        brokerage = 0
-        stt = 0
-        exchange_txn = 0
-        gst = 0
-        sebi = 0
-        stamp = 0
-        
-        if segment == 'EQ':
-            brokerage = 0
-            stt = 0.001 * turnover
-            exchange_txn = 0.0000345 * turnover
-            sebi = 0.000001 * turnover
-            stamp = 0.00015 * (entry_price * qty)
-        elif segment == 'FUT':
-            brokerage = min(40, 0.0003 * turnover)
-            stt = 0.0001 * (exit_price * qty)
-            exchange_txn = 0.00002 * turnover
-            sebi = 0.000001 * turnover
-            stamp = 0.00002 * (entry_price * qty)
-        elif segment == 'OPT':
-            brokerage = 40
-            stt = 0.0005 * (exit_price * qty)
-            exchange_txn = 0.00053 * turnover
-            sebi = 0.000001 * turnover
-            stamp = 0.00003 * (entry_price * qty)
-            
-        gst = 0.18 * (brokerage + exchange_txn + sebi)
-        total_charges = brokerage + stt + exchange_txn + gst + sebi + stamp
-        return total_charges
+    def calculate_costs(self, df):
+        """Estimated round-trip charges per trade, computed column-wise from the fee schedule."""
+        return ChargesService().calculate(df)
 
     def enrich_data(self, initial_capital=0, transactions=None, daily_ohlc=None):
         if self.df.empty and (not transactions or len(transactions) == 0):
             return
 
-        self.df['estimated_charges'] = self.df.apply(self.calculate_costs, axis=1)
+        self.df['estimated_charges'] = self.calculate_costs(self.df)
         self.df['net_pnl_after_charges'] = self.df['net_pnl'] - self.df['estimated_charges']
         
-        df_sorted = self.df.sort_values('entry_date')
-        
         transactions_df = pd.DataFrame()
         if transactions:
-            data = []
-            for t in transactions:
-                data.append({
-                    'date': t.date,
-                    'amount': t.amount,
-                    'type': t.type,
-                    'notes': t.notes
-                })
-            transactions_df = pd.DataFrame(data)
-            if not transactions_df.empty:
-                if '_sa_instance_state' in transactions_df.columns:
-                    transactions_df = transactions_df.drop(columns=['_sa_instance_state'])
-                transactions_df['date'] = pd.to_datetime(transactions_df['date'])
-                transactions_df['signed_amount'] = transactions_df.apply(
-                    lambda x: abs(x['amount']) if x['type'] == 'DEPOSIT' else -abs(x['amount']), axis=1
-                )
+            transactions_df = pd.DataFrame({
+                'date': [t.date for t in transactions],
+                'amount': [t.amount for t in transactions],
+                'type': [t.type for t in transactions],
+                'notes': [t.notes for t in transactions]
+            })
+            transactions_df['date'] = pd.to_datetime(transactions_df['date'])
+            amount = transactions_df['amount'].abs()
+            transactions_df['signed_amount'] = np.where(transactions_df['type'] == 'DEPOSIT', amount, -amount)
 
-        pnl_events = []
-        for _, row in self.df.iterrows():
-            if pd.notna(row['exit_date']):
-                pnl_events.append({'date': row['exit_date'], 'amount': row['net_pnl_after_charges'], 'type': 'TRADE'})
-            
+        # Realized cash-flow events: closed trades at exit plus deposits/withdrawals
+        events = []
+        if 'exit_date' in self.df.columns and not self.df.empty:
+            closed = self.df[self.df['exit_date'].notna()]
+            events.append(pd.DataFrame({
+                'date': closed['exit_date'],
+                'amount': closed['net_pnl_after_charges'],
+                'type': 'TRADE'
+            }))
         if not transactions_df.empty:
-            for _, row in transactions_df.iterrows():
-                pnl_events.append({'date': row['date'], 'amount': row['signed_amount'], 'type': 'TRANSACTION'})
+            events.append(pd.DataFrame({
+                'date': transactions_df['date'],
+                'amount': transactions_df['signed_amount'],
+                'type': 'TRANSACTION'
+            }))
+        events = [e for e in events if not e.empty]
             
-        if not pnl_events:
+        if not events:
              timeline_df = pd.DataFrame(columns=['date', 'amount', 'type'])
         else:
-            timeline_df = pd.DataFrame(pnl_events).sort_values('date')
+            timeline_df = pd.concat(events, ignore_index=True).sort_values('date')
         
-        allocations = []
-        account_values = []
-        
-        # Calculate allocations based on current capital at entry time
-        # This is an approximation
-        for _, row in df_sorted.iterrows():
-            realized_pnl = timeline_df[timeline_df['date'] < row['entry_date']]['amount'].sum()
+        # Capital at each trade's entry = initial capital + everything realized strictly before it.
+        # Cumulative sum over the sorted timeline plus searchsorted replaces a per-trade scan.
+        if not self.df.empty:
+            timeline_valid = timeline_df[timeline_df['date'].notna()]
+            event_dates = pd.to_datetime(timeline_valid['date']).to_numpy(dtype='datetime64[ns]')
+            cumulative = np.concatenate([[0.0], timeline_valid['amount'].astype(float).fillna(0).cumsum().to_numpy()])
+
+            entry_dates = self.df['entry_date'].to_numpy(dtype='datetime64[ns]')
+            positions = np.searchsorted(event_dates, entry_dates, side='left')
+            realized_pnl = np.where(pd.isna(entry_dates), 0.0, cumulative[positions])
             current_capital = initial_capital + realized_pnl
-            
-            trade_value = row['entry_price'] * row['qty']
-            allocation = (trade_value / current_capital) * 100 if current_capital > 0 else 0
-            
-            allocations.append(allocation)
-            account_values.append(current_capital)
-            
-        self.df['allocation_pct'] = allocations
-        self.df['account_value_at_entry'] = account_values
+
+            trade_value = (self.df['entry_price'] * self.df['qty']).to_numpy(dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                allocation = np.where(current_capital > 0, (trade_value / current_capital) * 100, 0)
+
+            self.df['allocation_pct'] = allocation
+            self.df['account_value_at_entry'] = current_capital
         
         self.timeline_df = timeline_df
         self.initial_capital = initial_capital
         self.daily_ohlc = daily_ohlc or {}
 
-    def get_equity_curve(self, interval='D'):
+    @staticmethod
+    def equity_curve_start(interval='D'):
+        """
+        First day whose daily OHLC get_equity_curve plots: today for the daily chart, the
+        Monday of the current (Sunday-ending) week for the weekly one, None for full history.
+        """
+        today = pd.Timestamp.now().normalize()
+        if interval == 'D':
+            return today.date()
+        if interval == 'W':
+            return (today - pd.Timedelta(days=today.weekday())).date()
+        return None
+
+    def get_equity_curve(self, interval='D', daily_ohlc=None):
+        # daily_ohlc overrides the one given to enrich_data (fresher intraday candles)
+        if daily_ohlc is None:
+            daily_ohlc = getattr(self, 'daily_ohlc', {})
         if not hasattr(self, 'timeline_df') or self.timeline_df.empty:
             if self.df.empty:
                 return pd.DataFrame()
@@ -303,8 +278,8 @@ class AnalyticsService:
                 # Actually, the previous filter was hardcoded in the loop.
                 pass
 
-            if date_obj in self.daily_ohlc:
-                ohlc = self.daily_ohlc[date_obj]
+            if date_obj in daily_ohlc:
+                ohlc = daily_ohlc[date_obj]
                 daily_data.append({
                     'date': date,
                     'open': ohlc['open'],
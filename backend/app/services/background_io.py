@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Bounded pool for the blocking DB and broker calls made by background loops."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_settings().BACKGROUND_IO_WORKERS,
+                thread_name_prefix="background-io"
+            )
+        return _executor
+
+async def run_blocking(fn, *args, **kwargs):
+    """Runs a blocking call in the background I/O pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+class EventLoopLagMonitor:
+    """
+    Measures event-loop lag: how late a periodic sleep wakes up. Anything running on the
+    loop without yielding (a blocking DB or broker call) shows up as lag, and so as
+    added latency on every request served by the worker meanwhile.
+    """
+    _instance = None
+    INTERVAL = 0.5 # seconds between probes
+    WINDOW = 1200 # samples kept (10 minutes at the default interval)
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventLoopLagMonitor, cls).__new__(cls)
+            cls._instance._samples = deque(maxlen=cls.WINDOW)
+            cls._instance._max_ms = 0.0
+            cls._instance._task = None
+        return cls._instance
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._probe())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.INTERVAL)
+            lag_ms = max(loop.time() - started - self.INTERVAL, 0.0) * 1000
+            self._samples.append(lag_ms)
+            self._max_ms = max(self._max_ms, lag_ms)
+            if lag_ms > 1000:
+                logger.warning(f"Event loop blocked for {lag_ms:.0f} ms")
+
+    def stats(self):
+        samples = sorted(self._samples)
+        stats = {
+            "interval_ms": self.INTERVAL * 1000,
+            "samples": len(samples),
+            "last_ms": None, "p50_ms": None, "p99_ms": None, "window_max_ms": None,
+            "max_ms": round(self._max_ms, 2)
+        }
+        if samples:
+            stats.update({
+                "last_ms": round(self._samples[-1], 2),
+                "p50_ms": round(samples[len(samples) // 2], 2),
+                "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 2),
+                "window_max_ms": round(samples[-1], 2)
+            })
+        executor = _executor
+        stats["io_pool"] = {
+            "workers": executor._max_workers if executor else get_settings().BACKGROUND_IO_WORKERS,
+            "queued": executor._work_queue.qsize() if executor else 0
+        }
+        return stats
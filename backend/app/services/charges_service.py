@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+
+# Segment codes used to index the rate tables (unknown segments carry no charges)
+SEGMENTS = ['EQ', 'FUT', 'OPT']
+
+# Fee schedule, one entry per revision. A trade is charged at the latest revision
+# whose effective_from is on or before its trade date.
+#   brokerage    = min(brokerage_pct * turnover, brokerage_cap) + brokerage_flat
+#   stt          = stt_turnover * turnover + stt_sell * sell_value
+#   exchange_txn = exchange_txn * turnover
+#   sebi         = sebi * turnover
+#   stamp        = stamp_buy * buy_value
+#   gst          = gst * (brokerage + exchange_txn + sebi)
+FEE_SCHEDULE = [
+    {
+        'effective_from': date(2000, 1, 1),
+        'gst': 0.18,
+        'rates': {
+            'EQ': {
+                'brokerage_pct': 0.0, 'brokerage_cap': np.inf, 'brokerage_flat': 0.0,
+                'stt_turnover': 0.001, 'stt_sell': 0.0,
+                'exchange_txn': 0.0000345, 'sebi': 0.000001, 'stamp_buy': 0.00015
+            },
+            'FUT': {
+                'brokerage_pct': 0.0003, 'brokerage_cap': 40.0, 'brokerage_flat': 0.0,
+                'stt_turnover': 0.0, 'stt_sell': 0.0001,
+                'exchange_txn': 0.00002, 'sebi': 0.000001, 'stamp_buy': 0.00002
+            },
+            'OPT': {
+                'brokerage_pct': 0.0, 'brokerage_cap': np.inf, 'brokerage_flat': 40.0,
+                'stt_turnover': 0.0, 'stt_sell': 0.0005,
+                'exchange_txn': 0.00053, 'sebi': 0.000001, 'stamp_buy': 0.00003
+            }
+        }
+    }
+]
+
+RATE_FIELDS = [
+    'brokerage_pct', 'brokerage_cap', 'brokerage_flat', 'stt_turnover', 'stt_sell',
+    'exchange_txn', 'sebi', 'stamp_buy'
+]
+
+class ChargesService:
+    """
+    Vectorized charges engine. Computes brokerage, STT, exchange fees, SEBI, stamp duty
+    and GST for whole trade columns using rates looked up from FEE_SCHEDULE.
+    """
+    def __init__(self, schedule=None):
+        schedule = sorted(schedule or FEE_SCHEDULE, key=lambda r: r['effective_from'])
+        self.effective_from = np.array(
+            [np.datetime64(r['effective_from'], 'ns') for r in schedule], dtype='datetime64[ns]'
+        )
+        self.gst = np.array([r['gst'] for r in schedule], dtype=float)
+
+        # field -> (revision x segment) matrix; the extra last column is the zero-rate
+        # row used for unknown segments
+        self.rates = {}
+        for field in RATE_FIELDS:
+            table = np.zeros((len(schedule), len(SEGMENTS) + 1))
+            for i, revision in enumerate(schedule):
+                for j, segment in enumerate(SEGMENTS):
+                    table[i, j] = revision['rates'].get(segment, {}).get(field, 0.0)
+            table[:, len(SEGMENTS)] = np.inf if field == 'brokerage_cap' else 0.0
+            self.rates[field] = table
+
+    def breakdown(self, df):
+        """
+        df needs segment, entry_price, exit_price, qty and a date column (exit_date,
+        falling back to entry_date). Open trades are estimated with exit = entry price.
+        Returns a DataFrame of charge components plus 'total', aligned to df.index.
+        """
+        columns = ['brokerage', 'stt', 'exchange_txn', 'sebi', 'stamp', 'gst', 'total']
+        if df.empty:
+            return pd.DataFrame(columns=columns, index=df.index, dtype=float)
+
+        segment = df['segment'].to_numpy()
+        segment_code = np.select(
+            [segment == s for s in SEGMENTS], list(range(len(SEGMENTS))), default=len(SEGMENTS)
+        )
+
+        trade_date = pd.to_datetime(df['exit_date']) if 'exit_date' in df.columns else pd.Series(pd.NaT, index=df.index)
+        if 'entry_date' in df.columns:
+            trade_date = trade_date.fillna(pd.to_datetime(df['entry_date']))
+        trade_date = trade_date.to_numpy(dtype='datetime64[ns]')
+        revision = np.searchsorted(self.effective_from, trade_date, side='right') - 1
+        # Undated trades (and trades before the first revision) use the latest / first revision
+        revision = np.where(pd.isna(trade_date), len(self.effective_from) - 1, np.clip(revision, 0, None))
+
+        rate = {field: table[revision, segment_code] for field, table in self.rates.items()}
+
+        entry_price = df['entry_price'].to_numpy(dtype=float)
+        exit_price = df['exit_price'].to_numpy(dtype=float) if 'exit_price' in df.columns else np.full(len(df), np.nan)
+        exit_price = np.where(np.isnan(exit_price), entry_price, exit_price)
+        qty = df['qty'].to_numpy(dtype=float)
+
+        buy_value = entry_price * qty
+        sell_value = exit_price * qty
+        turnover = buy_value + sell_value
+
+        brokerage = np.minimum(rate['brokerage_pct'] * turnover, rate['brokerage_cap']) + rate['brokerage_flat']
+        stt = rate['stt_turnover'] * turnover + rate['stt_sell'] * sell_value
+        exchange_txn = rate['exchange_txn'] * turnover
+        sebi = rate['sebi'] * turnover
+        stamp = rate['stamp_buy'] * buy_value
+        gst = self.gst[revision] * (brokerage + exchange_txn + sebi)
+
+        result = pd.DataFrame({
+            'brokerage': brokerage,
+            'stt': stt,
+            'exchange_txn': exchange_txn,
+            'sebi': sebi,
+            'stamp': stamp,
+            'gst': gst
+        }, index=df.index)
+        # Unknown segments carry no charges at all, even without prices
+        result[segment_code == len(SEGMENTS)] = 0.0
+        result['total'] = result.sum(axis=1, skipna=False)
+        return result
+
+    def calculate(self, df):
+        """Total estimated charges per trade as a Series aligned to df.index."""
+        return self.breakdown(df)['total']
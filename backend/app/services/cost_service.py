@@ -1,4 +1,3 @@
-import pandas as pd
 from datetime import date
 from app.models.all_models import DailyCost, OpenTrade
 from sqlalchemy.orm import Session
@@ -58,6 +57,7 @@ class CostService:
         return interest
 
     def update_daily_costs(self, orders_df, date_obj=None):
+        import pandas as pd
         if date_obj is None:
             date_obj = date.today()
             
@@ -0,0 +1,68 @@
+import threading
+import time
+from datetime import date
+from app.core.config import get_settings
+
+class DashboardCache:
+    """
+    Process-wide cache for the computed /analytics/dashboard payload.
+    Entries are keyed by (name, data version, day). Writers that change trades, orders
+    or transactions call bump_version(), which drops every entry. Account candles are
+    written every minute without a bump, so slices built from them are cached with
+    a short TTL instead.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DashboardCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._version = 0
+            cls._instance._entries = {}
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+            cls._instance._invalidations = 0
+            cls._instance.live_ttl = get_settings().DASHBOARD_LIVE_TTL
+        return cls._instance
+
+    @property
+    def version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._invalidations += 1
+
+    def get_or_compute(self, name, compute, ttl=None):
+        """Cached result of compute(); with a ttl the entry also expires after ttl seconds."""
+        # The equity curve hides bars before today, so the day is part of the key
+        key = (name, self._version, date.today())
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and (ttl is None or now - entry[1] <= ttl):
+                self._hits += 1
+                return entry[0]
+            self._misses += 1
+
+        payload = compute()
+
+        with self._lock:
+            # Only keep it if no write happened while computing
+            if key[1] == self._version:
+                self._entries[key] = (payload, now)
+        return payload
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "version": self._version,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "hit_rate": (self._hits / total) if total else 0.0
+            }
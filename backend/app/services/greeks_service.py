@@ -1,8 +1,12 @@
 
 import math
-from datetime import datetime, date
+import calendar
+import numpy as np
+from datetime import datetime, date, timedelta
+from functools import lru_cache
 import re
 import logging
+from app.services.instrument_service import InstrumentService
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +15,143 @@ def norm_cdf(x):
     """Cumulative distribution function for the standard normal distribution."""
     return (1.0 + math.erf(x / math.sqrt(2.0))) / 2.0
 
+# --- Vectorized Black-Scholes engine ---
+# All functions take array-likes (broadcast together) and work on whole chains at once.
+# flag is +1 for calls (CE) and -1 for puts (PE).
+
+def norm_cdf_vec(x):
+    # ndtr is a compiled ufunc that keeps precision deep in the lower tail (far OTM prices);
+    # scipy.special is imported on first use, not when the routers load
+    from scipy.special import ndtr
+    return ndtr(np.asarray(x, dtype=float))
+
+def norm_pdf_vec(x):
+    return np.exp(-0.5 * np.square(x)) / math.sqrt(2.0 * math.pi)
+
+def option_flags(option_types):
+    """'CE'/'PE' (or 'c'/'p') -> +1/-1."""
+    types = np.asarray(option_types).astype(str)
+    return np.where(np.isin(types, ['CE', 'c', 'C', 'CALL']), 1.0, -1.0)
+
+def _d1_d2(S, K, T, r, sigma):
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+def bs_price(S, K, T, r, sigma, flag):
+    S, K, T, r, sigma, flag = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, r, sigma, flag)))
+    d1, d2 = _d1_d2(S, K, T, r, sigma)
+    return flag * (S * norm_cdf_vec(flag * d1) - K * np.exp(-r * T) * norm_cdf_vec(flag * d2))
+
+def bs_vega(S, K, T, r, sigma):
+    d1, _ = _d1_d2(S, K, T, r, sigma)
+    return S * norm_pdf_vec(d1) * np.sqrt(T)
+
+def bs_delta(S, K, T, r, sigma, flag):
+    """Delta; expired contracts (T <= 0) get 1/-1 when ITM and 0 otherwise."""
+    S, K, T, r, sigma, flag = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (S, K, T, r, sigma, flag)))
+    live = T > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, _ = _d1_d2(S, K, np.where(live, T, 1.0), r, sigma)
+    delta = np.where(flag > 0, norm_cdf_vec(d1), norm_cdf_vec(d1) - 1.0)
+    expired = np.where(flag > 0, (S > K).astype(float), -(S < K).astype(float))
+    return np.where(live, delta, expired)
+
+def implied_volatility(price, S, K, T, r, flag, tol=1e-10, max_iter=100, lo=1e-6, hi=10.0):
+    """
+    Implied volatility by safeguarded Newton: each step is Newton on the price, falling
+    back to bisection whenever the Newton step leaves the current [lo, hi] bracket.
+    ITM contracts are solved on their OTM counterpart via put-call parity, where the
+    price is all time value. Returns NaN where the price is outside the no-arbitrage
+    bounds or the solver did not converge.
+    """
+    price, S, K, T, r, flag = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (price, S, K, T, r, flag)))
+    n = price.shape
+    iv = np.full(n, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        discounted_k = K * np.exp(-r * T)
+        forward_value = S - discounted_k
+        # Parity: C - P = S - K*exp(-rT); switch ITM calls to puts and ITM puts to calls
+        itm = flag * forward_value > 0
+        otm_flag = np.where(itm, -flag, flag)
+        otm_price = np.where(itm, price - flag * forward_value, price)
+        upper = np.where(otm_flag > 0, S, discounted_k)
+        active = (T > 0) & (S > 0) & (K > 0) & (otm_price > 0) & (otm_price < upper)
+
+        low = np.full(n, lo)
+        high = np.full(n, hi)
+        # Brenner-Subrahmanyam starting point, kept inside the bracket
+        sigma = np.sqrt(2.0 * math.pi / T) * price / S
+        sigma = np.clip(np.nan_to_num(sigma, nan=0.5, posinf=0.5), lo * 10, hi / 2)
+        converged = np.zeros(n, dtype=bool)
+
+        for _ in range(max_iter):
+            idx = active & ~converged
+            if not idx.any():
+                break
+            s_, k_, t_, r_, f_, sig = S[idx], K[idx], T[idx], r[idx], otm_flag[idx], sigma[idx]
+            diff = bs_price(s_, k_, t_, r_, sig, f_) - otm_price[idx]
+            vega = bs_vega(s_, k_, t_, r_, sig)
+
+            # Price is increasing in sigma: shrink the bracket around the root
+            new_low = np.where(diff < 0, sig, low[idx])
+            new_high = np.where(diff > 0, sig, high[idx])
+            newton = sig - diff / vega
+            bisect = 0.5 * (new_low + new_high)
+            step = np.where((vega > 0) & (newton > new_low) & (newton < new_high), newton, bisect)
+
+            low[idx] = new_low
+            high[idx] = new_high
+            sigma[idx] = step
+            converged[idx] = (diff == 0) | (np.abs(step - sig) < tol) | ((new_high - new_low) < tol)
+
+    iv[converged] = sigma[converged]
+    return iv
+
+# --- Symbol parsing ---
+# Formats:
+# 1. Weekly: NIFTY23D0720900PE (SYMBOL YY M DD STRIKE TYPE), M: 1-9, O, N, D
+# 2. Monthly: NIFTY23DEC20900PE (SYMBOL YY MMM STRIKE TYPE), expiring on the last Thursday
+WEEKLY_PATTERN = re.compile(r"^([A-Z]+)(\d{2})([1-9OND])(\d{2})(\d+)(CE|PE)$")
+MONTHLY_PATTERN = re.compile(r"^([A-Z]+)(\d{2})([A-Z]{3})(\d+)(CE|PE)$")
+
+WEEKLY_MONTHS = {
+    '1': 1, '2': 2, '3': 3, '4': 4, '5': 5,
+    '6': 6, '7': 7, '8': 8, '9': 9,
+    'O': 10, 'N': 11, 'D': 12
+}
+# Zerodha uses JAN, FEB, MAR, APR, MAY, JUN, JUL, AUG, SEP, OCT, NOV, DEC
+MONTHLY_MONTHS = {
+    'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+    'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
+}
+
+def last_thursday(year, month):
+    """Last Thursday (weekday 3) of the month."""
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    return last_day - timedelta(days=(last_day.weekday() - 3) % 7)
+
+@lru_cache(maxsize=4096)
+def _parse_symbol_cached(symbol):
+    """Regex parse of a trading symbol; the result is shared, so callers copy it."""
+    match = WEEKLY_PATTERN.match(symbol)
+    if match:
+        name, yy, m_char, dd, strike, otype = match.groups()
+        expiry = date(2000 + int(yy), WEEKLY_MONTHS[m_char], int(dd))
+        return {'underlying': name, 'strike': float(strike), 'type': otype, 'expiry': expiry}
+
+    match = MONTHLY_PATTERN.match(symbol)
+    if match:
+        name, yy, mmm, strike, otype = match.groups()
+        month = MONTHLY_MONTHS.get(mmm)
+        if month is None:
+            return None
+        expiry = last_thursday(2000 + int(yy), month)
+        return {'underlying': name, 'strike': float(strike), 'type': otype, 'expiry': expiry}
+
+    return None
+
 class GreeksService:
     def __init__(self):
         self.risk_free_rate = 0.10  # 10%
@@ -48,89 +189,20 @@ class GreeksService:
 
     def parse_symbol(self, symbol):
         """
-        Parse Zerodha trading symbol to extract metadata.
-        Formats:
-        1. Weekly: NIFTY23D0720900PE (SYMBOL YY M DD STRIKE TYPE)
-           M: 1-9, O, N, D
-        2. Monthly: NIFTY23DEC20900PE (SYMBOL YY MMM STRIKE TYPE)
+        Option metadata (underlying, strike, type, expiry) for a Zerodha trading symbol.
+        The instrument master is consulted first for the exchange's exact expiry; symbols
+        it does not list (or before the first sync) are parsed from the symbol itself.
         """
-        # Regex for Weekly: (SYMBOL)(YY)(M)(DD)(STRIKE)(TYPE)
-        # M is [1-9OND]
-        weekly_pattern = r"^([A-Z]+)(\d{2})([1-9OND])(\d{2})(\d+)(CE|PE)$"
-        
-        # Regex for Monthly: (SYMBOL)(YY)(MMM)(STRIKE)(TYPE)
-        monthly_pattern = r"^([A-Z]+)(\d{2})([A-Z]{3})(\d+)(CE|PE)$"
-        
-        # Try Weekly first
-        match = re.match(weekly_pattern, symbol)
-        if match:
-            name, yy, m_char, dd, strike, otype = match.groups()
-            year = 2000 + int(yy)
-            day = int(dd)
-            
-            # Map M char to month
-            m_map = {
-                '1': 1, '2': 2, '3': 3, '4': 4, '5': 5, 
-                '6': 6, '7': 7, '8': 8, '9': 9, 
-                'O': 10, 'N': 11, 'D': 12
-            }
-            month = m_map.get(m_char)
-            
-            expiry = date(year, month, day)
-            return {
-                'underlying': name,
-                'strike': float(strike),
-                'type': otype,
-                'expiry': expiry
-            }
-            
-        # Try Monthly
-        match = re.match(monthly_pattern, symbol)
-        if match:
-            name, yy, mmm, strike, otype = match.groups()
-            year = 2000 + int(yy)
-            
-            # Map MMM to month (assuming standard English abbr)
-            # Zerodha uses JAN, FEB, MAR, APR, MAY, JUN, JUL, AUG, SEP, OCT, NOV, DEC
-            mmm_map = {
-                'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
-            }
-            month = mmm_map.get(mmm)
-            
-            # For monthly, it's usually the last Thursday. 
-            # But we don't know the exact date from the symbol alone easily without calendar logic.
-            # However, usually the symbol implies the expiry.
-            # Wait, Monthly symbols DO NOT have the day. 
-            # We need to find the last Thursday of that month.
-            # This is a bit complex. 
-            # Simplification: Use the 28th of the month as an approximation if exact date logic is too heavy?
-            # Or implement Last Thursday logic.
-            
-            expiry = self.get_expiry_date(year, month)
-            
-            return {
-                'underlying': name,
-                'strike': float(strike),
-                'type': otype,
-                'expiry': expiry
-            }
-            
-        return None
+        parsed = InstrumentService().get_option_metadata(symbol)
+        if parsed is None:
+            parsed = _parse_symbol_cached(symbol)
+            parsed = dict(parsed) if parsed else None
+        return parsed
 
     def get_expiry_date(self, year, month):
         """Get the last Thursday of the month."""
-        import calendar
-        # Get last day of month
-        last_day = calendar.monthrange(year, month)[1]
-        dt = date(year, month, last_day)
-        
-        # Go back until Thursday (weekday 3)
-        while dt.weekday() != 3:
-            dt = dt.replace(day=dt.day - 1)
-            
-        # Check if it's a holiday? (Too complex for now, ignore holidays)
-        return dt
+        # Holidays are not accounted for; use parse_symbol for listed contracts
+        return last_thursday(year, month)
 
     def get_underlying_symbol(self, name):
         """Map parsed name to Kite instrument symbol."""
@@ -146,23 +218,24 @@ class GreeksService:
 
     def calculate_iv(self, S, K, T, r, price, option_type):
         """
-        Calculate Implied Volatility using py_vollib.
+        Calculate Implied Volatility for one contract (see calculate_ivs).
         """
-        try:
-            from py_vollib.black_scholes.implied_volatility import implied_volatility
-            
-            # py_vollib expects 'c' for Call and 'p' for Put
-            flag = 'c' if option_type == 'CE' else 'p'
-            
-            # Handle edge cases
-            if T <= 0: return 0
-            if price <= 0: return 0
-            
-            iv = implied_volatility(price, S, K, T, r, flag)
-            return iv
-        except Exception as e:
-            # logger.warning(f"IV calculation failed: {e}")
-            return None
+        # Handle edge cases
+        if T <= 0: return 0
+        if price <= 0: return 0
+
+        iv = self.calculate_ivs(S, K, T, r, price, option_type)[()]
+        return None if np.isnan(iv) else float(iv)
+
+    def calculate_ivs(self, S, K, T, r, prices, option_types):
+        """
+        Implied volatilities for arrays of contracts in one call. NaN where no IV exists.
+        """
+        return implied_volatility(prices, S, K, T, r, option_flags(option_types))
+
+    def calculate_deltas(self, S, K, T, r, sigmas, option_types):
+        """Black-Scholes deltas for arrays of contracts in one call."""
+        return bs_delta(S, K, T, r, sigmas, option_flags(option_types))
 
     def get_next_month_futures_symbol(self, underlying, today=None):
         """
@@ -315,34 +388,52 @@ class GreeksService:
         results = {}
         today = date.today()
         
+        # Collect every leg first so all option legs share one IV/delta computation
+        legs = [] # (item_id, leg inputs)
         for item in items:
             item_type = item.get('type')
             constituents = item.get('constituents', [])
             
             if item_type == 'BASKET':
-                total_exposure = 0
+                results[item['id']] = 0
                 for c in constituents:
-                    exp = self._calculate_single_exposure(c, ltp_map, today)
-                    total_exposure += exp
-                results[item['id']] = total_exposure
+                    legs.append((item['id'], self._exposure_inputs(c, ltp_map, today)))
             
             elif item_type == 'TRADE':
                 # Single Trade wrapped in item
+                results[item['id']] = 0
                 if constituents:
-                    c = constituents[0]
-                    exp = self._calculate_single_exposure(c, ltp_map, today)
-                    results[item['id']] = exp
-                else:
-                    results[item['id']] = 0
+                    legs.append((item['id'], self._exposure_inputs(constituents[0], ltp_map, today)))
             
             else:
                 # Fallback for direct trade objects (if used elsewhere)
-                exp = self._calculate_single_exposure(item, ltp_map, today)
-                results[item.get('id')] = exp
+                results[item.get('id')] = 0
+                legs.append((item.get('id'), self._exposure_inputs(item, ltp_map, today)))
+
+        options = [(item_id, leg) for item_id, leg in legs if isinstance(leg, dict)]
+        for item_id, leg in legs:
+            if not isinstance(leg, dict):
+                results[item_id] += leg
+
+        if options:
+            cols = {k: np.array([leg[k] for _, leg in options]) for k in ('S', 'K', 'T', 'r', 'price', 'qty')}
+            types = [leg['type'] for _, leg in options]
+            iv = self.calculate_ivs(cols['S'], cols['K'], cols['T'], cols['r'], cols['price'], types)
+            # Use calculated IV or fallback to default
+            sigma = np.where(np.isnan(iv), self.default_iv, iv)
+            delta = self.calculate_deltas(cols['S'], cols['K'], cols['T'], cols['r'], sigma, types)
+            # Exposure = |Delta * S * Qty|
+            exposure = np.abs(delta * cols['S'] * cols['qty'])
+            for (item_id, _), value in zip(options, exposure):
+                results[item_id] += float(value)
                 
         return results
 
-    def _calculate_single_exposure(self, trade, ltp_map, today):
+    def _exposure_inputs(self, trade, ltp_map, today):
+        """
+        Either the final exposure of a leg (non-options, missing prices) or a dict of
+        Black-Scholes inputs for an option leg.
+        """
         # Handle different key names
         symbol = trade.get('tradingsymbol') or trade.get('trading_symbol') or trade.get('symbol')
         qty = trade.get('quantity') or trade.get('qty')
@@ -379,21 +470,7 @@ class GreeksService:
         fut_key = f"NFO:{fut_symbol}"
         F = ltp_map.get(fut_key, 0)
         
-        # Calculate Time to Futures Expiry (approx 30-60 days)
-        # For simplicity, let's use the option's expiry T for the rate calculation if we don't have exact futures expiry
-        # Or better, assume futures expiry is roughly 30 days from now if we can't calculate it easily
-        # Actually, T in the formula is time to *futures* expiry.
-        # We need the expiry date of the futures contract.
-        # Parse the futures symbol to get expiry?
-        # NIFTY24JANFUT -> Jan 2024. Expiry is last Thursday.
-        # Let's reuse parse logic or get_expiry_date.
-        
-        # Quick parse of generated symbol
-        # fut_symbol: NIFTY24JANFUT
-        # We know the month and year from generation logic.
-        # We can calculate expiry.
-        
-        # Re-derive year/month from today logic
+        # Time to the next-month futures expiry (last Thursday), for the rate calculation
         year = today.year
         month = today.month
         if month == 12:
@@ -408,7 +485,7 @@ class GreeksService:
         
         r = self.calculate_risk_free_rate(S, F, T_fut)
 
-        # 4. Calculate Delta
+        # 4. Option inputs
         K = parsed['strike']
         T_days = (parsed['expiry'] - today).days
         T = max(T_days, 0) / 365.0
@@ -416,19 +493,7 @@ class GreeksService:
         # If expiring today, T might be 0. Use small value
         if T == 0: T = 0.0001 
         
-        # Calculate IV
-        iv = self.calculate_iv(S, K, T, r, option_ltp, parsed['type'])
-        
-        # Use calculated IV or fallback to default
-        sigma = iv if iv is not None else self.default_iv
-        
-        delta = self.calculate_delta(S, K, T, r, sigma, parsed['type'])
-        
-        # 5. Calculate Exposure
-        # Exposure = |Delta * S * Qty|
-        exposure = abs(delta * S * qty)
-        
-        return exposure
+        return {'S': S, 'K': K, 'T': T, 'r': r, 'price': option_ltp, 'qty': qty, 'type': parsed['type']}
 
     def get_required_instruments(self, items):
         """
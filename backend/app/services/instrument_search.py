@@ -0,0 +1,100 @@
+import numpy as np
+
+# Sorts after any character a symbol can contain, closing a prefix range
+PREFIX_END = chr(0x10FFFF)
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _Partition:
+    """Search structures over one set of instrument rows (one exchange, or all of them)."""
+    def __init__(self, symbols, names, rows):
+        # Sorted-prefix array: upper-cased tradingsymbols in order, with their row positions
+        order = np.argsort(symbols, kind='stable')
+        self.symbols = symbols[order]
+        self.symbol_rows = rows[order]
+
+        # Unique names (sorted), the rows of each name in symbol order, and a trigram
+        # index of name ids
+        self.names, name_ids = np.unique(names[order], return_inverse=True)
+        by_name = np.argsort(name_ids, kind='stable')
+        bounds = np.searchsorted(name_ids[by_name], np.arange(len(self.names) + 1))
+        self.name_rows = [self.symbol_rows[by_name[bounds[i]:bounds[i + 1]]] for i in range(len(self.names))]
+
+        self.name_list = self.names.tolist()
+        postings = {}
+        for name_id, name in enumerate(self.name_list):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(name_id)
+        self.trigrams = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def prefix_rows(self, query, limit):
+        lo = np.searchsorted(self.symbols, query, side='left')
+        hi = np.searchsorted(self.symbols, query + PREFIX_END, side='left')
+        return self.symbol_rows[lo:min(hi, lo + limit)]
+
+    def matching_names(self, query):
+        """
+        Ids of names containing the query, lazily: names starting with it first, then
+        the rest, each in name order.
+        """
+        lo = int(np.searchsorted(self.names, query, side='left'))
+        hi = int(np.searchsorted(self.names, query + PREFIX_END, side='left'))
+        yield from range(lo, hi)
+        if len(query) < 3:
+            return
+
+        # Candidates come from the rarest trigram of the query and are checked by substring
+        # as they are consumed, so a search stops as soon as it has enough rows
+        candidates = None
+        for gram in trigrams(query):
+            ids = self.trigrams.get(gram)
+            if ids is None:
+                return
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        name_list = self.name_list
+        for name_id in candidates.tolist():
+            if not lo <= name_id < hi and query in name_list[name_id]:
+                yield name_id
+
+class InstrumentSearchIndex:
+    """
+    Instrument search over the instrument store: tradingsymbol prefix matches first, then
+    instruments whose name contains the query (names starting with it ahead of the rest).
+    Built once per store version, with a partition per exchange so the exchange filter
+    never scans other exchanges.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.version = store.version
+        symbols = np.char.upper(np.asarray(store.column('tradingsymbol')))
+        names = np.char.upper(np.asarray(store.column('name')))
+        exchanges = np.asarray(store.column('exchange'))
+        rows = np.arange(len(symbols), dtype=np.int64)
+
+        self.partitions = {None: _Partition(symbols, names, rows)}
+        for exchange in np.unique(exchanges).tolist():
+            mask = exchanges == exchange
+            self.partitions[exchange] = _Partition(symbols[mask], names[mask], rows[mask])
+
+    def search(self, query, exchange=None, limit=20):
+        """Store row positions of the best matches, best first."""
+        query = query.strip().upper()
+        partition = self.partitions.get(exchange or None)
+        if not query or partition is None:
+            return []
+
+        results = partition.prefix_rows(query, limit).tolist()
+        if len(results) >= limit:
+            return results
+
+        seen = set(results)
+        for name_id in partition.matching_names(query):
+            for row in partition.name_rows[name_id].tolist():
+                if row not in seen:
+                    seen.add(row)
+                    results.append(row)
+                    if len(results) >= limit:
+                        return results
+        return results
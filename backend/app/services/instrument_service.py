@@ -1,53 +1,61 @@
 
-import pandas as pd
+import numpy as np
 import os
 import logging
+from datetime import timedelta
 from app.core.config import get_settings
+from app.services.instrument_store import InstrumentStore
+from app.services.instrument_search import InstrumentSearchIndex
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+INSTRUMENTS_DIR = "instruments"
+# Pre-store CSV cache, migrated into the store on first load
 INSTRUMENTS_FILE = "instruments.csv"
+SYNC_EXCHANGES = ['NSE', 'NFO', 'BSE', 'BFO', 'MCX']
 
 class InstrumentService:
     _instance = None
-    _lot_size_map = {}
+    # Instrument master is considered current for a day after a sync
+    MAX_AGE = timedelta(days=1)
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(InstrumentService, cls).__new__(cls)
+            cls._instance.store = InstrumentStore(INSTRUMENTS_DIR)
+            cls._instance._option_chains = {}
+            cls._instance._chains_version = None
+            cls._instance._search_index = None
             cls._instance.load_instruments()
         return cls._instance
 
     def load_instruments(self):
-        """Load instruments from CSV into memory."""
-        if os.path.exists(INSTRUMENTS_FILE):
-            try:
-                df = pd.read_csv(INSTRUMENTS_FILE)
-                # Create a dictionary for fast lookup: symbol -> lot_size
-                # We prioritize NFO/BFO segments for options/futures
-                # But symbol names are usually unique within an exchange, but might overlap across exchanges (e.g. RELIANCE on NSE vs BSE)
-                # However, for F&O, the trading symbol is unique (e.g. NIFTY25DECFUT).
-                
-                # Filter for relevant segments to keep memory usage low? 
-                # No, let's keep all, 35k is small for memory.
-                
-                self._lot_size_map = dict(zip(df['tradingsymbol'], df['lot_size']))
-                logger.info(f"Loaded {len(self._lot_size_map)} instruments into memory.")
-            except Exception as e:
-                logger.error(f"Error loading instruments cache: {e}")
+        """Memory-map the instrument store (migrating the old CSV cache if that is all there is)."""
+        try:
+            if not self.store.reload() and os.path.exists(INSTRUMENTS_FILE):
+                import pandas as pd
+                logger.info(f"Migrating {INSTRUMENTS_FILE} into the instrument store...")
+                os.makedirs(INSTRUMENTS_DIR, exist_ok=True)
+                self.store.save(pd.read_csv(INSTRUMENTS_FILE))
+        except Exception as e:
+            logger.error(f"Error loading instruments cache: {e}")
+
+        if self.store.loaded:
+            logger.info(f"Loaded {len(self.store)} instruments into memory.")
         else:
             logger.warning("Instruments cache file not found. Lot sizes will fallback to defaults.")
 
     def sync_instruments(self, kite_client):
-        """Fetch instruments from Kite and save to CSV."""
+        """Fetch instruments from Kite and save them to the store."""
         try:
             logger.info("Syncing instruments from Zerodha...")
-            df = kite_client.get_all_instruments(exchanges=['NSE', 'NFO', 'BSE', 'BFO', 'MCX'])
+            df = kite_client.fetch_instruments(exchanges=SYNC_EXCHANGES)
             if not df.empty:
-                df.to_csv(INSTRUMENTS_FILE, index=False)
-                logger.info(f"Saved {len(df)} instruments to {INSTRUMENTS_FILE}")
-                self.load_instruments() # Reload into memory
+                os.makedirs(INSTRUMENTS_DIR, exist_ok=True)
+                self.store.save(df)
+                logger.info(f"Saved {len(df)} instruments to {INSTRUMENTS_DIR}")
+                self._get_search_index()
                 return True
             else:
                 logger.warning("Fetched empty instruments dataframe.")
@@ -56,6 +64,103 @@ class InstrumentService:
             logger.error(f"Error syncing instruments: {e}")
             return False
 
+    def is_fresh(self, exchanges):
+        """True if the store covers the exchanges and was synced within MAX_AGE."""
+        return self.store.is_fresh(exchanges, self.MAX_AGE)
+
+    def get_instruments(self, exchanges=None, segments=None):
+        """Instrument dump (Kite's columns) for the given exchanges/segments from the store."""
+        return self.store.frame(exchanges=exchanges, segments=segments)
+
     def get_lot_size(self, symbol):
         """Get lot size for a symbol. Returns None if not found."""
-        return self._lot_size_map.get(symbol)
+        rows = self.store.find_symbol(symbol)
+        if not rows:
+            return None
+        return int(self.store.column('lot_size')[rows[0]])
+
+    def get_instrument_tokens(self, keys):
+        """Map "EXCHANGE:SYMBOL" keys to instrument tokens; unknown keys are omitted."""
+        tokens = self.store.column('instrument_token') if self.store.loaded else None
+        return {key: int(tokens[row]) for key, row in self.store.find(keys).items()}
+
+    def get_option_metadata(self, symbol):
+        """
+        {underlying, strike, type, expiry} for an option trading symbol from the
+        instrument master (the exchange's exact expiry), or None.
+        """
+        instrument_types = self.store.column('instrument_type') if self.store.loaded else None
+        for row in self.store.find_symbol(symbol):
+            if instrument_types[row] in ('CE', 'PE'):
+                return {
+                    'underlying': str(self.store.column('name')[row]),
+                    'strike': float(self.store.column('strike')[row]),
+                    'type': str(instrument_types[row]),
+                    'expiry': self.store.column('expiry')[row].astype(object)
+                }
+        return None
+
+    def index_option_chains(self, df):
+        """
+        Build name -> expiry -> (sorted strike array, CE legs, PE legs) for NFO options,
+        so option chains are served without filtering the instrument dump per request.
+        Legs are aligned with the strike array and are None where a side is not listed.
+        """
+        import pandas as pd
+        opts = df[df['segment'] == 'NFO-OPT']
+        if opts.empty:
+            self._option_chains = {}
+            return
+        opts = opts.assign(expiry=pd.to_datetime(opts['expiry']).dt.date).sort_values(['name', 'expiry', 'strike'])
+
+        chains = {}
+        for (name, expiry), group in opts.groupby(['name', 'expiry'], sort=False):
+            strikes = np.unique(group['strike'].to_numpy(dtype=float))
+            legs = {'CE': [None] * len(strikes), 'PE': [None] * len(strikes)}
+            positions = np.searchsorted(strikes, group['strike'].to_numpy(dtype=float))
+            for pos, option_type, symbol, token, lot_size in zip(
+                positions, group['instrument_type'], group['tradingsymbol'],
+                group['instrument_token'], group['lot_size']
+            ):
+                if option_type in legs and legs[option_type][pos] is None:
+                    legs[option_type][pos] = {
+                        'tradingsymbol': symbol,
+                        'instrument_token': int(token),
+                        'lot_size': int(lot_size)
+                    }
+            chains.setdefault(name, {})[expiry] = (strikes, legs['CE'], legs['PE'])
+        self._option_chains = chains
+        logger.info(f"Indexed option chains for {len(chains)} underlyings.")
+
+    def _chains(self):
+        # Indexed once per store version, on first use
+        version = self.store.version
+        if version is not None and version != self._chains_version:
+            self.index_option_chains(self.get_instruments(segments=['NFO-OPT']))
+            self._chains_version = version
+        return self._option_chains
+
+    def has_option_chains(self):
+        return bool(self._chains())
+
+    def get_option_chains(self, name):
+        """{expiry: (strikes, ce_legs, pe_legs)} for an underlying name, or None."""
+        return self._chains().get(name)
+
+    def _get_search_index(self):
+        # Rebuilt once per store version; swapped in whole so readers never see a partial index
+        index = self._search_index
+        version = self.store.version
+        if version is None:
+            return None
+        if index is None or index.version != version:
+            index = InstrumentSearchIndex(self.store)
+            self._search_index = index
+        return index
+
+    def search_instruments(self, query, exchange=None, limit=20):
+        """Best matches for the query (tradingsymbol prefix first, then name), as Kite dump dicts."""
+        index = self._get_search_index()
+        if index is None:
+            return []
+        return self.store.records(index.search(query, exchange=exchange, limit=limit))
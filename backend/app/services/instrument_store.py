@@ -0,0 +1,203 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+import numpy as np
+
+# Kite instrument dump columns and the dtype each is stored with
+COLUMNS = {
+    'instrument_token': np.int64,
+    'exchange_token': np.int64,
+    'tradingsymbol': str,
+    'name': str,
+    'last_price': np.float64,
+    'expiry': 'datetime64[D]',
+    'strike': np.float64,
+    'tick_size': np.float64,
+    'lot_size': np.int64,
+    'instrument_type': str,
+    'segment': str,
+    'exchange': str,
+}
+
+class InstrumentStore:
+    """
+    Instrument master persisted as one .npy file per typed column and memory-mapped on
+    load, so every worker process shares the same pages instead of holding its own copy.
+    Rows are sorted by "EXCHANGE:TRADINGSYMBOL" (the `key` column) for binary-search
+    lookups; `by_symbol` (with the matching sorted `symbols` column) orders rows by
+    tradingsymbol alone.
+
+    Each save goes to a new version directory and then CURRENT is swapped atomically;
+    other processes pick the new version up on their next access.
+    """
+    CURRENT = "CURRENT"
+    CHECK_INTERVAL = 1.0 # seconds between CURRENT mtime checks
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._columns = None
+        self._meta = {}
+        self._mtime = None
+        self._checked_at = 0.0
+
+    # --- Writing ---
+
+    def save(self, df):
+        """Writes the instrument dump as a new version and makes it current."""
+        import pandas as pd
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            values = df[name] if name in df else pd.Series([None] * len(df), index=df.index)
+            if dtype == 'datetime64[D]':
+                columns[name] = pd.to_datetime(values, errors='coerce').to_numpy().astype('datetime64[D]')
+            elif dtype is str:
+                columns[name] = values.fillna('').astype(str).to_numpy(dtype=str)
+            else:
+                columns[name] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=dtype)
+
+        key = np.char.add(np.char.add(columns['exchange'], ':'), columns['tradingsymbol'])
+        order = np.argsort(key, kind='stable')
+        columns = {name: values[order] for name, values in columns.items()}
+        columns['key'] = key[order]
+        columns['by_symbol'] = np.argsort(columns['tradingsymbol'], kind='stable').astype(np.int32)
+        columns['symbols'] = columns['tradingsymbol'][columns['by_symbol']]
+
+        version = str(time.time_ns())
+        path = os.path.join(self.directory, version)
+        os.makedirs(path)
+        for name, values in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values, allow_pickle=False)
+        meta = {
+            "saved_at": datetime.now().isoformat(),
+            "rows": int(len(key)),
+            "exchanges": sorted(set(columns['exchange'].tolist()))
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        pointer = os.path.join(self.directory, self.CURRENT)
+        previous = None
+        if os.path.exists(pointer):
+            with open(pointer) as f:
+                previous = f.read().strip()
+        with open(f"{pointer}.tmp", "w") as f:
+            f.write(version)
+        os.replace(f"{pointer}.tmp", pointer)
+        self._prune(keep={version, previous})
+        self.reload()
+
+    def _prune(self, keep):
+        # The version before this one stays so processes mid-load do not lose it
+        for entry in os.listdir(self.directory):
+            path = os.path.join(self.directory, entry)
+            if entry not in keep and entry.isdigit() and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    # --- Reading ---
+
+    def reload(self):
+        """Maps the current version. Returns False if nothing has been saved yet."""
+        pointer = os.path.join(self.directory, self.CURRENT)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+            with open(pointer) as f:
+                version = f.read().strip()
+            path = os.path.join(self.directory, version)
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            columns = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+                for name in (*COLUMNS, 'key', 'by_symbol', 'symbols')
+            }
+        except FileNotFoundError:
+            return False
+        meta["version"] = version
+        self._columns, self._meta, self._mtime = columns, meta, mtime
+        return True
+
+    def _current(self):
+        """Columns of the current version, re-mapped if another process saved since."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.CHECK_INTERVAL:
+            self._checked_at = now
+            try:
+                mtime = os.stat(os.path.join(self.directory, self.CURRENT)).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is not None and mtime != self._mtime:
+                self.reload()
+        return self._columns
+
+    @property
+    def loaded(self):
+        return self._current() is not None
+
+    @property
+    def version(self):
+        self._current()
+        return self._meta.get("version")
+
+    def __len__(self):
+        columns = self._current()
+        return 0 if columns is None else len(columns['key'])
+
+    def column(self, name):
+        return self._current()[name]
+
+    def is_fresh(self, exchanges, max_age):
+        """True if the current version covers the exchanges and is newer than max_age."""
+        if not self.loaded:
+            return False
+        saved_at = datetime.fromisoformat(self._meta["saved_at"])
+        return datetime.now() - saved_at < max_age and set(exchanges) <= set(self._meta["exchanges"])
+
+    def find(self, keys):
+        """Row positions of "EXCHANGE:SYMBOL" keys; unknown keys are omitted."""
+        columns = self._current()
+        keys = list(keys)
+        if columns is None or not keys:
+            return {}
+        sorted_keys = columns['key']
+        wanted = np.asarray(keys, dtype=str)
+        positions = np.minimum(np.searchsorted(sorted_keys, wanted), len(sorted_keys) - 1)
+        found = sorted_keys[positions] == wanted
+        return {key: pos for key, pos, hit in zip(keys, positions.tolist(), found.tolist()) if hit}
+
+    def find_symbol(self, symbol):
+        """Row positions with this tradingsymbol, across exchanges."""
+        columns = self._current()
+        if columns is None:
+            return []
+        symbols = columns['symbols']
+        lo = np.searchsorted(symbols, symbol, side='left')
+        hi = np.searchsorted(symbols, symbol, side='right')
+        return columns['by_symbol'][lo:hi].tolist()
+
+    def records(self, rows):
+        """Rows as Kite dump dicts, in the order given."""
+        columns = self._current()
+        if columns is None or not len(rows):
+            return []
+        rows = np.asarray(rows, dtype=np.int64)
+        values = {name: columns[name][rows].tolist() for name in COLUMNS}
+        values['expiry'] = ['' if expiry is None else expiry for expiry in values['expiry']]
+        return [dict(zip(values, record)) for record in zip(*values.values())]
+
+    def frame(self, exchanges=None, segments=None):
+        """The instruments as a DataFrame shaped like the Kite dump (expiry as date or '')."""
+        import pandas as pd
+        columns = self._current()
+        if columns is None:
+            return pd.DataFrame()
+        mask = np.ones(len(columns['key']), dtype=bool)
+        if exchanges is not None:
+            mask &= np.isin(columns['exchange'], list(exchanges))
+        if segments is not None:
+            mask &= np.isin(columns['segment'], list(segments))
+
+        data = {name: np.asarray(columns[name][mask]) for name in COLUMNS}
+        expiry = data['expiry']
+        data['expiry'] = np.where(np.isnat(expiry), '', expiry.astype(object))
+        return pd.DataFrame(data)
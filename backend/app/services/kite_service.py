@@ -1,20 +1,26 @@
-from kiteconnect import KiteConnect
-import pandas as pd
 from datetime import datetime, timedelta
 import logging
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import get_settings
+from app.services.margin_cache import MarginCache
 
 logger = logging.getLogger(__name__)
 
 class KiteClient:
-    _instruments_cache = None
-    _instruments_cache_time = None
+    # Basket margin requests in flight at once
+    MARGIN_CONCURRENCY = 4
 
-    def __init__(self, api_key, api_secret=None, request_token=None, access_token=None):
+    def __init__(self, api_key, api_secret=None, request_token=None, access_token=None, pool=None):
+        from kiteconnect import KiteConnect
         self.api_key = api_key
         self.api_secret = api_secret
-        self.kite = KiteConnect(api_key=api_key)
+        # pool: HTTPAdapter kwargs for the underlying requests session
+        self.kite = KiteConnect(api_key=api_key, pool=pool)
+        self.access_token = access_token
         
         if access_token:
             self.kite.set_access_token(access_token)
@@ -33,6 +39,7 @@ class KiteClient:
         return self.kite.login_url()
 
     def fetch_orders(self):
+        import pandas as pd
         try:
             orders = self.kite.orders()
             return pd.DataFrame(orders)
@@ -41,6 +48,7 @@ class KiteClient:
             return pd.DataFrame()
 
     def fetch_positions(self):
+        import pandas as pd
         try:
             positions = self.kite.positions()
             return pd.DataFrame(positions['net'])
@@ -49,6 +57,7 @@ class KiteClient:
             return pd.DataFrame()
 
     def fetch_holdings(self):
+        import pandas as pd
         try:
             holdings = self.kite.holdings()
             return pd.DataFrame(holdings)
@@ -81,11 +90,17 @@ class KiteClient:
         return self.fetch_ltp(indices)
 
     def save_access_token(self, token, filepath="access_token.json"):
+        # Written to a temp file and swapped in atomically, so other workers polling the
+        # mtime never read a truncated file
+        tmp_path = f"{filepath}.{os.getpid()}.tmp"
         try:
-            with open(filepath, "w") as f:
+            with open(tmp_path, "w") as f:
                 json.dump({"access_token": token, "timestamp": str(datetime.now())}, f)
+            os.replace(tmp_path, filepath)
         except Exception as e:
             logger.error(f"Error saving access token: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     @staticmethod
     def load_access_token(filepath="access_token.json"):
@@ -107,6 +122,7 @@ class KiteClient:
             return False
 
     def process_trades(self, orders_df, db_open_trades=None, db_constituents=None, db_closed_trades=None):
+        import pandas as pd
         if orders_df.empty:
             return []
 
@@ -482,11 +498,16 @@ class KiteClient:
             raise e
 
     def get_all_instruments(self, exchanges=['NSE', 'NFO', 'BSE', 'MCX']):
-        # Check cache (valid for 24 hours)
-        if KiteClient._instruments_cache is not None and KiteClient._instruments_cache_time:
-            if (datetime.now() - KiteClient._instruments_cache_time).total_seconds() < 86400:
-                return KiteClient._instruments_cache
+        """Instrument dump from the shared instrument store, re-synced once it is a day old."""
+        from app.services.instrument_service import InstrumentService
+        instrument_service = InstrumentService()
+        if not instrument_service.is_fresh(exchanges):
+            instrument_service.sync_instruments(self)
+        return instrument_service.get_instruments(exchanges=exchanges)
 
+    def fetch_instruments(self, exchanges):
+        """Download the instrument dump for the exchanges from Kite."""
+        import pandas as pd
         try:
             all_instruments = []
             # If we have a valid kite instance, fetch from API
@@ -497,14 +518,8 @@ class KiteClient:
                         all_instruments.extend(instruments)
                     except Exception as e:
                         logger.error(f"Error fetching instruments for {exchange}: {e}")
-                
-                df = pd.DataFrame(all_instruments)
-                if not df.empty:
-                    KiteClient._instruments_cache = df
-                    KiteClient._instruments_cache_time = datetime.now()
-                    return df
             
-            return pd.DataFrame()
+            return pd.DataFrame(all_instruments)
         except Exception as e:
             logger.error(f"Error fetching instruments: {e}")
             return pd.DataFrame()
@@ -512,31 +527,13 @@ class KiteClient:
     def search_instruments(self, query, exchange=None):
         """
         Search instruments by symbol or name.
-        Returns top 20 matches.
+        Returns top 20 matches, tradingsymbol prefix matches first.
         """
-        df = self.get_all_instruments()
-        if df.empty:
-            return []
-            
-        query = query.upper()
-        
-        # Filter by exchange if provided
-        if exchange:
-            df = df[df['exchange'] == exchange]
-        
-        # Filter
-        # Priority: Starts with query > Contains query
-        # We can do a simple contains for now
-        
-        # Create a mask
-        # tradingsymbol contains query OR name contains query
-        mask = df['tradingsymbol'].str.contains(query, case=False, na=False) | \
-               df['name'].str.contains(query, case=False, na=False)
-               
-        results = df[mask].head(20)
-        
-        # Convert to list of dicts
-        return results.to_dict('records')
+        from app.services.instrument_service import InstrumentService, SYNC_EXCHANGES
+        instrument_service = InstrumentService()
+        if not instrument_service.is_fresh(SYNC_EXCHANGES):
+            instrument_service.sync_instruments(self)
+        return instrument_service.search_instruments(query, exchange=exchange)
 
     def is_market_open(self):
         try:
@@ -585,79 +582,203 @@ class KiteClient:
                 - variety (optional, default 'regular')
                 - price (optional)
         
+        All TRADE items go in one order_margins request; baskets are queried concurrently
+        under the margin rate limit. Unchanged items are served from MarginCache.
+        
         Returns: Dict mapping item['id'] -> margin_required
         """
         if not self.kite:
             return {}
             
         results = {}
+        cache = MarginCache()
+        trades = [] # (id, order, cache key)
+        baskets = [] # (id, orders, cache key)
         
-        try:
-            # Process Baskets
-            for item in items:
+        for item in items:
+            if item.get('id') is None:
+                logger.error(f"Skipping margin item without an id: {item}")
+                continue
+            try:
                 if item['type'] == 'BASKET':
-                    orders = []
-                    for c in item['constituents']:
-                        orders.append({
-                            "exchange": c['exchange'],
-                            "tradingsymbol": c['tradingsymbol'],
-                            "transaction_type": c['transaction_type'],
-                            "variety": c.get('variety', 'regular'),
-                            "product": c['product'],
-                            "order_type": c.get('order_type', 'MARKET'),
-                            "quantity": c['quantity'],
-                            "price": c.get('price', 0),
-                            "trigger_price": c.get('trigger_price', 0)
-                        })
-                    
-                    try:
-                        # basket_order_margins expects a list of orders
-                        margins = self.kite.basket_order_margins(orders)
-                        logger.info(f"Basket margins response for {item['id']}: {json.dumps(margins, default=str)}")
-                        
-                        # Use 'final' -> 'total' as the blocked margin (includes hedge benefits)
-                        # Fallback to 'initial' -> 'total' if final is missing or negative (which implies API anomaly for net buy)
-                        final_total = 0
-                        if margins and 'final' in margins:
-                            final_total = margins['final'].get('total', 0)
-                            
-                        if final_total > 0:
-                            results[item['id']] = final_total
-                        elif margins and 'initial' in margins:
-                            results[item['id']] = margins['initial'].get('total', 0)
-                        else:
-                            results[item['id']] = 0
-                    except Exception as e:
-                        logger.error(f"Error fetching basket margin for {item['id']}: {e}")
-                        results[item['id']] = 0
-                        
+                    orders = [self._margin_order(c) for c in item['constituents']]
+                    pending, kind = baskets, 'basket'
                 elif item['type'] == 'TRADE':
-                    # Single Order
                     c = item['constituents'][0] # Should be single item list or just dict
-                    order_params = [{
-                        "exchange": c['exchange'],
-                        "tradingsymbol": c['tradingsymbol'],
-                        "transaction_type": c['transaction_type'],
-                        "variety": c.get('variety', 'regular'),
-                        "product": c['product'],
-                        "order_type": c.get('order_type', 'MARKET'),
-                        "quantity": c['quantity'],
-                        "price": c.get('price', 0),
-                        "trigger_price": c.get('trigger_price', 0)
-                    }]
-                    
+                    orders = [self._margin_order(c)]
+                    pending, kind = trades, 'order'
+                else:
+                    continue
+            except Exception as e:
+                logger.error(f"Invalid margin item {item['id']}: {e}")
+                results[item['id']] = 0
+                continue
+            
+            key = MarginCache.key(kind, orders)
+            margin = cache.get(key)
+            if margin is not None:
+                results[item['id']] = margin
+            else:
+                pending.append((item['id'], orders if kind == 'basket' else orders[0], key))
+        
+        # Single orders: one request, response list is aligned with the input list
+        if trades:
+            try:
+                MARGIN_RATE_LIMITER.acquire()
+                margins = self.kite.order_margins([order for _, order, _ in trades]) or []
+            except Exception as e:
+                # Kite rejects the whole request for one bad order; retry each trade on its
+                # own so only the bad row gets 0
+                logger.error(f"Batched order margins failed for {len(trades)} trades, retrying one by one: {e}")
+                margins = [self._order_margin(item_id, order) for item_id, order, _ in trades]
+            for i, (item_id, _, key) in enumerate(trades):
+                margin = margins[i] if i < len(margins) else None
+                if margin is not None:
+                    results[item_id] = margin.get('total', 0)
+                    cache.put(key, results[item_id])
+                else:
+                    results[item_id] = 0
+        
+        # Baskets: fanned out, each call waits its turn on the rate limiter
+        if baskets:
+            with ThreadPoolExecutor(max_workers=min(self.MARGIN_CONCURRENCY, len(baskets))) as pool:
+                futures = {
+                    pool.submit(self._basket_margin, orders): (item_id, key)
+                    for item_id, orders, key in baskets
+                }
+                for future, (item_id, key) in futures.items():
                     try:
-                        margins = self.kite.order_margins(order_params)
-                        # Response is a list of margin objects corresponding to input list
-                        if margins and len(margins) > 0:
-                            results[item['id']] = margins[0].get('total', 0)
-                        else:
-                            results[item['id']] = 0
+                        results[item_id] = future.result()
+                        cache.put(key, results[item_id])
                     except Exception as e:
-                        logger.error(f"Error fetching order margin for {item['id']}: {e}")
-                        results[item['id']] = 0
-                        
-        except Exception as e:
-            logger.error(f"Error in fetch_margins: {e}")
+                        logger.error(f"Error fetching basket margin for {item_id}: {e}")
+                        results[item_id] = 0
             
         return results
+
+    @staticmethod
+    def _margin_order(c):
+        return {
+            "exchange": c['exchange'],
+            "tradingsymbol": c['tradingsymbol'],
+            "transaction_type": c['transaction_type'],
+            "variety": c.get('variety', 'regular'),
+            "product": c['product'],
+            "order_type": c.get('order_type', 'MARKET'),
+            "quantity": c['quantity'],
+            "price": c.get('price', 0),
+            "trigger_price": c.get('trigger_price', 0)
+        }
+
+    def _order_margin(self, item_id, order):
+        """Margin object for a single order, or None if Kite rejects it."""
+        try:
+            MARGIN_RATE_LIMITER.acquire()
+            margins = self.kite.order_margins([order])
+            return margins[0] if margins else None
+        except Exception as e:
+            logger.error(f"Error fetching order margin for {item_id}: {e}")
+            return None
+
+    def _basket_margin(self, orders):
+        MARGIN_RATE_LIMITER.acquire()
+        # basket_order_margins expects a list of orders
+        margins = self.kite.basket_order_margins(orders)
+        
+        # Use 'final' -> 'total' as the blocked margin (includes hedge benefits)
+        # Fallback to 'initial' -> 'total' if final is missing or negative (which implies API anomaly for net buy)
+        final_total = 0
+        if margins and 'final' in margins:
+            final_total = margins['final'].get('total', 0)
+            
+        if final_total > 0:
+            return final_total
+        elif margins and 'initial' in margins:
+            return margins['initial'].get('total', 0)
+        return 0
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+# Kite allows 10 requests/second per API key; margin calls stay under that, shared by all clients
+MARGIN_RATE_LIMITER = RateLimiter(rate=8)
+
+
+class KiteClientRegistry:
+    """
+    Process-wide KiteClient holder. Keeps one client (one pooled HTTP session) for the
+    current access token instead of building a KiteConnect per request or tick.
+    The token file is only re-read when its mtime changes; /login/callback swaps the
+    client through set_access_token().
+    """
+    _instance = None
+    TOKEN_FILE = "access_token.json"
+    POOL = {"pool_connections": 4, "pool_maxsize": 16}
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(KiteClientRegistry, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._client = None
+            cls._instance._token = None
+            cls._instance._token_mtime = None
+        return cls._instance
+
+    def _refresh_token(self):
+        try:
+            mtime = os.stat(self.TOKEN_FILE).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._token_mtime:
+            self._token_mtime = mtime
+            self._token = KiteClient.load_access_token(self.TOKEN_FILE) if mtime is not None else None
+
+    @property
+    def access_token(self):
+        with self._lock:
+            self._refresh_token()
+            return self._token
+
+    def get_client(self):
+        """Shared client for the current token (unauthenticated if not logged in)."""
+        with self._lock:
+            self._refresh_token()
+            if self._client is None or self._client.access_token != self._token:
+                self._client = KiteClient(api_key=get_settings().KITE_API_KEY, access_token=self._token, pool=self.POOL)
+            return self._client
+
+    def set_access_token(self, token):
+        """Persists a new token and swaps in a client for it."""
+        client = KiteClient(api_key=get_settings().KITE_API_KEY, access_token=token, pool=self.POOL)
+        with self._lock:
+            client.save_access_token(token, self.TOKEN_FILE)
+            self._token = token
+            try:
+                self._token_mtime = os.stat(self.TOKEN_FILE).st_mtime
+            except OSError:
+                self._token_mtime = None
+            self._client = client
+        return client
+
+    def generate_session(self, request_token):
+        """Exchanges a login request_token for an access token and swaps in a client for it."""
+        data = self.get_client().kite.generate_session(request_token, api_secret=get_settings().KITE_API_SECRET)
+        self.set_access_token(data["access_token"])
+        return data
+
+def get_kite_client():
+    """FastAPI dependency returning the shared KiteClient."""
+    return KiteClientRegistry().get_client()
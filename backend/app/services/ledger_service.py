@@ -0,0 +1,79 @@
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from app.core.database import SessionLocal
+from app.models.all_models import Transaction, ClosedTrade, OpenTrade
+
+class LedgerSnapshot:
+    """
+    In-process ledger totals for the live account value: net transactions, realized
+    PnL and the open positions (basket constituents flattened).
+    Trade and transaction writes mark their side stale so it is reloaded once on the
+    next read. A periodic reseed picks up writes made by other processes (scripts,
+    other workers).
+    """
+    _instance = None
+    RESEED_INTERVAL = timedelta(minutes=15)
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LedgerSnapshot, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._net_transactions = None
+            cls._instance._realized_pnl = None
+            cls._instance._positions = None
+            cls._instance._seeded_at = None
+        return cls._instance
+
+    def get(self):
+        """
+        Returns (net_transactions, realized_pnl, positions), where positions is a list of
+        (exchange, symbol, avg_price, qty, type). Only touches the DB when stale.
+        """
+        with self._lock:
+            expired = self._seeded_at is None or datetime.now() - self._seeded_at > self.RESEED_INTERVAL
+            if expired:
+                self._net_transactions = None
+                self._realized_pnl = None
+                self._positions = None
+
+            if self._net_transactions is None or self._realized_pnl is None or self._positions is None:
+                self._reload()
+            return self._net_transactions, self._realized_pnl, list(self._positions)
+
+    def _reload(self):
+        db = SessionLocal()
+        try:
+            if self._net_transactions is None:
+                total_deposits = db.query(func.sum(Transaction.amount)).filter(Transaction.type == 'DEPOSIT').scalar() or 0
+                total_withdrawals = db.query(func.sum(Transaction.amount)).filter(Transaction.type == 'WITHDRAWAL').scalar() or 0
+                self._net_transactions = total_deposits - total_withdrawals
+                self._seeded_at = datetime.now()
+
+            if self._realized_pnl is None:
+                self._realized_pnl = db.query(func.sum(ClosedTrade.pnl)).scalar() or 0
+
+            if self._positions is None:
+                positions = []
+                open_trades = db.query(OpenTrade).options(selectinload(OpenTrade.constituents)).all()
+                for t in open_trades:
+                    legs = t.constituents if t.is_basket else [t]
+                    for leg in legs:
+                        positions.append((leg.exchange, leg.symbol, leg.avg_price, leg.qty, leg.type))
+                self._positions = positions
+        finally:
+            db.close()
+
+    def invalidate_transactions(self):
+        """Called after transaction writes commit; net transactions reload lazily."""
+        # Not adjusted in place: a reload between the commit and this call would
+        # already include the row, and the amount would be counted twice
+        with self._lock:
+            self._net_transactions = None
+
+    def invalidate_trades(self):
+        """Called after trade writes commit; realized PnL and positions reload lazily."""
+        with self._lock:
+            self._realized_pnl = None
+            self._positions = None
@@ -1,11 +1,16 @@
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta, date
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from sqlalchemy import case
+from app.core.database import SessionLocal, bulk_upsert
 from app.models.all_models import AccountValue, DailyEquity, Transaction, ClosedTrade, OpenTrade
-from app.services.kite_service import KiteClient
+from app.services.kite_service import KiteClientRegistry
+from app.services.market_data_service import MarketDataService
+from app.services.ledger_service import LedgerSnapshot
+from app.services.background_io import run_blocking
 from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -16,6 +21,16 @@ class LiveAccountService:
     _running = False
     _current_candle = None
     _last_aggregation_time = None
+    # Closed minute candles waiting for the writer task
+    CANDLE_QUEUE_SIZE = 1000
+    CANDLE_BATCH_SIZE = 100
+    # A failed batch is retried with exponential backoff before its candles are given up
+    CANDLE_WRITE_ATTEMPTS = 5
+    CANDLE_RETRY_DELAY = 1.0
+    _candle_queue = None
+    _writer_task = None
+    _tracking_task = None
+    _writer_stats = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -26,8 +41,36 @@ class LiveAccountService:
         if self._running:
             return
         self._running = True
+        self._candle_queue = asyncio.Queue(maxsize=self.CANDLE_QUEUE_SIZE)
+        self._writer_stats = {
+            "batches": 0, "candles": 0, "dropped": 0, "failed_writes": 0, "failed_batches": 0, "lost": 0,
+            "last_write_ms": None, "total_write_ms": 0.0
+        }
         logger.info("Starting Live Account Value Tracking...")
-        asyncio.create_task(self._tracking_loop())
+        self._writer_task = asyncio.create_task(self._candle_writer_loop())
+        self._tracking_task = asyncio.create_task(self._tracking_loop())
+
+    async def stop_tracking(self):
+        """Stops the loop and flushes queued candles plus the in-progress one."""
+        if not self._running:
+            return
+        self._running = False
+        # Wait the tracking loop out first so it cannot enqueue a candle after the sentinel
+        self._tracking_task.cancel()
+        try:
+            await self._tracking_task
+        except asyncio.CancelledError:
+            pass
+        if self._current_candle:
+            self._enqueue_candle(self._current_candle)
+            self._current_candle = None
+        # Sentinel: the writer exits once everything before it is written
+        await self._candle_queue.put(None)
+        try:
+            await asyncio.wait_for(self._writer_task, timeout=30)
+        except asyncio.TimeoutError:
+            logger.error(f"Candle writer did not finish; {self._candle_queue.qsize()} candles left unsaved")
+        logger.info("Live Account Value Tracking stopped.")
 
     async def _tracking_loop(self):
         while self._running:
@@ -39,8 +82,8 @@ class LiveAccountService:
                     await asyncio.sleep(60)
                     continue
 
-                # 2. Calculate Current Account Value
-                value = self._calculate_account_value()
+                # 2. Calculate Current Account Value (ledger reload and quotes may block)
+                value = await run_blocking(self._calculate_account_value)
                 if value is None:
                     logger.warning("Account value is None (Token missing or error).")
                     await asyncio.sleep(5)
@@ -66,8 +109,11 @@ class LiveAccountService:
 
     async def _run_aggregation(self):
         """
-        Runs the batch aggregation process.
+        Runs the batch aggregation process in the background I/O pool.
         """
+        await run_blocking(self._aggregate)
+
+    def _aggregate(self):
         db = SessionLocal()
         try:
             from app.repositories.trade_repository import TradeRepository
@@ -88,51 +134,28 @@ class LiveAccountService:
         return start <= t <= end
 
     def _calculate_account_value(self):
-        db = SessionLocal()
         try:
-            from sqlalchemy import func
-            
-            # 1. Total Net Transactions (All Time)
-            # Assuming Transaction.amount is positive and type determines sign
-            total_deposits = db.query(func.sum(Transaction.amount)).filter(Transaction.type == 'DEPOSIT').scalar() or 0
-            total_withdrawals = db.query(func.sum(Transaction.amount)).filter(Transaction.type == 'WITHDRAWAL').scalar() or 0
-            net_transactions = total_deposits - total_withdrawals
-            
-            # 2. Total Realized PnL (All Time)
-            total_realized = db.query(func.sum(ClosedTrade.pnl)).scalar() or 0
+            # 1. & 2. Net transactions and realized PnL (all time) plus open positions,
+            # from the in-process ledger; no DB round trip unless a write invalidated it
+            net_transactions, total_realized, positions = LedgerSnapshot().get()
             
             # 3. Current Unrealized PnL (Live)
-            open_trades = db.query(OpenTrade).all()
             total_unrealized = 0
             
-            if open_trades:
-                instruments = set()
-                for t in open_trades:
-                    if t.is_basket:
-                        for c in t.constituents:
-                            instruments.add(f"{c.exchange}:{c.symbol}")
-                    else:
-                        instruments.add(f"{t.exchange}:{t.symbol}")
+            if positions:
+                instruments = {f"{exchange}:{symbol}" for exchange, symbol, _, _, _ in positions}
                 
-                token = KiteClient.load_access_token()
+                registry = KiteClientRegistry()
+                token = registry.access_token
                 if token and instruments:
-                    kite = KiteClient(api_key=settings.KITE_API_KEY, access_token=token)
-                    ltp_map = kite.fetch_ltp(list(instruments))
+                    kite = registry.get_client()
+                    ltp_map = MarketDataService().get_ltp(list(instruments), kite)
                     
-                    for t in open_trades:
-                        if t.is_basket:
-                            for c in t.constituents:
-                                key = f"{c.exchange}:{c.symbol}"
-                                ltp = ltp_map.get(key)
-                                if ltp:
-                                    pnl = (ltp - c.avg_price) * c.qty if c.type == 'LONG' else (c.avg_price - ltp) * c.qty
-                                    total_unrealized += pnl
-                        else:
-                            key = f"{t.exchange}:{t.symbol}"
-                            ltp = ltp_map.get(key)
-                            if ltp:
-                                pnl = (ltp - t.avg_price) * t.qty if t.type == 'LONG' else (t.avg_price - ltp) * t.qty
-                                total_unrealized += pnl
+                    for exchange, symbol, avg_price, qty, trade_type in positions:
+                        ltp = ltp_map.get(f"{exchange}:{symbol}")
+                        if ltp:
+                            pnl = (ltp - avg_price) * qty if trade_type == 'LONG' else (avg_price - ltp) * qty
+                            total_unrealized += pnl
                 else:
                     if not token:
                         return None
@@ -144,8 +167,6 @@ class LiveAccountService:
         except Exception as e:
             logger.error(f"Error calculating account value: {e}")
             return None
-        finally:
-            db.close()
 
     def _update_candle(self, now, value):
         # Round down to nearest minute
@@ -161,7 +182,7 @@ class LiveAccountService:
             # New minute started
             # 1. Save previous candle if exists
             if self._current_candle:
-                self._save_candle(self._current_candle)
+                self._enqueue_candle(self._current_candle)
             
             # 2. Start new candle
             self._current_candle = {
@@ -172,21 +193,83 @@ class LiveAccountService:
                 'close': value
             }
 
-    def _save_candle(self, candle_data):
+    def _enqueue_candle(self, candle_data):
+        if self._candle_queue is None:
+            # Tracking not started (e.g. called directly); write inline
+            self._save_candles([candle_data])
+            return
+        if self._candle_queue.full():
+            # Keep the newest candles if the DB has been unreachable for a long time
+            self._candle_queue.get_nowait()
+            self._writer_stats["dropped"] += 1
+            logger.warning("Candle queue full; dropped the oldest candle.")
+        self._candle_queue.put_nowait(dict(candle_data))
+
+    async def _candle_writer_loop(self):
+        """Drains the candle queue in batches; DB writes run off the event loop."""
+        while True:
+            candle = await self._candle_queue.get()
+            stop = candle is None
+            batch = [] if stop else [candle]
+            while not stop and len(batch) < self.CANDLE_BATCH_SIZE and not self._candle_queue.empty():
+                candle = self._candle_queue.get_nowait()
+                if candle is None:
+                    stop = True
+                else:
+                    batch.append(candle)
+
+            if batch:
+                await self._write_batch(batch)
+            if stop:
+                return
+
+    async def _write_batch(self, batch):
+        """Writes one batch, retrying with backoff; newer candles keep queueing meanwhile."""
+        stats = self._writer_stats
+        delay = self.CANDLE_RETRY_DELAY
+        for attempt in range(1, self.CANDLE_WRITE_ATTEMPTS + 1):
+            started = time.perf_counter()
+            if await run_blocking(self._save_candles, batch):
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+                stats["batches"] += 1
+                stats["candles"] += len(batch)
+                stats["last_write_ms"] = elapsed_ms
+                stats["total_write_ms"] += elapsed_ms
+                return True
+            stats["failed_writes"] += 1
+            if attempt < self.CANDLE_WRITE_ATTEMPTS:
+                await asyncio.sleep(delay)
+                delay *= 2
+        stats["failed_batches"] += 1
+        stats["lost"] += len(batch)
+        logger.error(f"Gave up on {len(batch)} candles after {self.CANDLE_WRITE_ATTEMPTS} attempts")
+        return False
+
+    def candle_writer_stats(self):
+        stats = dict(self._writer_stats or {})
+        stats["queue_depth"] = self._candle_queue.qsize() if self._candle_queue else 0
+        stats["avg_write_ms"] = round(stats["total_write_ms"] / stats["batches"], 2) if stats.get("batches") else None
+        stats.pop("total_write_ms", None)
+        return stats
+
+    def _save_candles(self, candles):
+        """Upserts the candles; returns False if the write failed."""
         db = SessionLocal()
         try:
-            # Check if exists (idempotency)
-            existing = db.query(AccountValue).filter(AccountValue.timestamp == candle_data['timestamp']).first()
-            if existing:
-                existing.high = max(existing.high, candle_data['high'])
-                existing.low = min(existing.low, candle_data['low'])
-                existing.close = candle_data['close']
-                # Open usually doesn't change unless we missed the start
-            else:
-                candle = AccountValue(**candle_data)
-                db.add(candle)
+            # Upsert on timestamp (idempotency); open is kept from the first write
+            bulk_upsert(
+                db, AccountValue, candles, index_elements=['timestamp'],
+                update_columns=['close'],
+                update_set={
+                    'high': lambda c, new: case((new.high > c.high, new.high), else_=c.high),
+                    'low': lambda c, new: case((new.low < c.low, new.low), else_=c.low)
+                }
+            )
             db.commit()
+            return True
         except Exception as e:
-            logger.error(f"Error saving candle: {e}")
+            db.rollback()
+            logger.error(f"Error saving {len(candles)} candles: {e}")
+            return False
         finally:
             db.close()
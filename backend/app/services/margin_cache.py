@@ -0,0 +1,59 @@
+import hashlib
+import json
+import threading
+import time
+from app.core.config import get_settings
+
+class MarginCache:
+    """
+    TTL cache of margin requirements keyed by a hash of the order parameters, so a
+    refresh of the trade-management screen only re-queries baskets and trades whose
+    constituents changed.
+    """
+    _instance = None
+    # Expired entries are swept once the cache grows this large
+    MAX_ENTRIES = 1000
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MarginCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._entries = {} # key -> (margin, stored_at)
+            cls._instance.ttl = get_settings().MARGIN_CACHE_TTL
+            cls._instance._hits = 0
+            cls._instance._misses = 0
+        return cls._instance
+
+    @staticmethod
+    def key(kind, orders):
+        """Hash of the orders; constituent order within a basket does not matter."""
+        canonical = sorted(json.dumps(order, sort_keys=True, default=str) for order in orders)
+        return hashlib.sha1(json.dumps([kind, canonical]).encode()).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] <= self.ttl:
+                self._hits += 1
+                return entry[0]
+            if entry:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key, margin):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries = {k: v for k, v in self._entries.items() if now - v[1] <= self.ttl}
+            self._entries[key] = (margin, now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "entries": len(self._entries)
+            }
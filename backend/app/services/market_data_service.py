@@ -0,0 +1,204 @@
+import threading
+import logging
+import time
+from collections import OrderedDict
+from app.services.quote_cache import QuoteCache
+
+logger = logging.getLogger(__name__)
+
+class MarketDataService:
+    """
+    Streaming last-price table fed by KiteTicker, keyed by instrument_token.
+    Consumers call get_ltp() with the same "EXCHANGE:SYMBOL" keys as KiteClient.fetch_ltp;
+    instruments are subscribed on first use and anything without a usable streamed price
+    is fetched over REST.
+
+    Open positions are pinned and stay subscribed. Other subscriptions are kept in
+    least-recently-used order and dropped once idle, or to make room under the
+    per-connection limit, so browsing option chains cannot crowd positions out.
+    """
+    _instance = None
+    # Prices are trusted while the socket is up; after a disconnect only this long (seconds)
+    STALE_AFTER = 60
+    # Kite allows 3000 instruments per websocket connection
+    MAX_SUBSCRIPTIONS = 3000
+    # Unpinned instruments not requested for this long (seconds) are unsubscribed
+    IDLE_EXPIRY = 600
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MarketDataService, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._prices = {} # instrument_token -> (last_price, received_at)
+            cls._instance._subscribed = OrderedDict() # instrument_token -> last requested, least recent first
+            cls._instance._pinned = set()
+            cls._instance._ticker = None
+            cls._instance._access_token = None
+        return cls._instance
+
+    def start(self, api_key, access_token, root=None):
+        """Connects the ticker (threaded). Reconnects if the access token changed."""
+        from kiteconnect import KiteTicker
+        from twisted.internet import reactor
+        if self._ticker is not None and self._access_token == access_token:
+            return
+        self.stop()
+
+        ticker = KiteTicker(api_key, access_token, root=root)
+        ticker.on_connect = self._on_connect
+        ticker.on_ticks = self._on_ticks
+        ticker.on_close = lambda ws, code, reason: logger.info(f"Ticker closed: {code} {reason}")
+        ticker.on_error = lambda ws, code, reason: logger.error(f"Ticker error: {code} {reason}")
+        self._ticker = ticker
+        self._access_token = access_token
+
+        if reactor.running:
+            reactor.callFromThread(ticker.connect, threaded=True)
+        else:
+            ticker.connect(threaded=True)
+        logger.info("Market data ticker started.")
+
+    def stop(self):
+        ticker, self._ticker = self._ticker, None
+        self._access_token = None
+        if ticker is not None:
+            from twisted.internet import reactor
+            if reactor.running:
+                reactor.callFromThread(ticker.close)
+
+    def is_connected(self):
+        return self._ticker is not None and self._ticker.is_connected()
+
+    def _on_connect(self, ws, response):
+        with self._lock:
+            tokens = list(self._pinned | set(self._subscribed))
+        if tokens:
+            ws.subscribe(tokens)
+            ws.set_mode(ws.MODE_LTP, tokens)
+
+    def _on_ticks(self, ws, ticks):
+        now = time.monotonic()
+        with self._lock:
+            for tick in ticks:
+                token = tick['instrument_token']
+                # Ticks already in flight when a token was unsubscribed are ignored
+                if token in self._pinned or token in self._subscribed:
+                    self._prices[token] = (tick['last_price'], now)
+
+    def subscribe(self, tokens):
+        """
+        Subscribes tokens on request and marks them used now. Returns the newly subscribed
+        tokens; none are added if the limit is taken by pinned and just-used tokens.
+        """
+        now = time.monotonic()
+        with self._lock:
+            new = []
+            for token in set(tokens):
+                if token in self._pinned:
+                    continue
+                if token in self._subscribed:
+                    self._subscribed.move_to_end(token)
+                    self._subscribed[token] = now
+                else:
+                    new.append(token)
+            evicted = self._evict(now, len(new))
+            new = new[:max(self.MAX_SUBSCRIPTIONS - len(self._pinned) - len(self._subscribed), 0)]
+            for token in new:
+                self._subscribed[token] = now
+
+        self._send(subscribe=new, unsubscribe=evicted)
+        return new
+
+    def pin(self, tokens):
+        """
+        Keeps exactly these tokens subscribed regardless of use (open positions). Tokens
+        pinned before but not now fall back to idle expiry. Returns the newly subscribed tokens.
+        """
+        now = time.monotonic()
+        pinned = set(tokens)
+        with self._lock:
+            for token in self._pinned - pinned:
+                self._subscribed[token] = now
+            new = [t for t in pinned - self._pinned if t not in self._subscribed]
+            for token in pinned:
+                self._subscribed.pop(token, None)
+            self._pinned = pinned
+            evicted = self._evict(now, 0)
+
+        self._send(subscribe=new, unsubscribe=evicted)
+        return new
+
+    def pin_open_positions(self):
+        """Pins the instruments of the open positions; called at start and after trade syncs."""
+        from app.services.ledger_service import LedgerSnapshot
+        _, _, positions = LedgerSnapshot().get()
+        keys = {f"{exchange}:{symbol}" for exchange, symbol, _, _, _ in positions}
+        from app.services.instrument_service import InstrumentService
+        return self.pin(InstrumentService().get_instrument_tokens(keys).values())
+
+    def _evict(self, now, incoming):
+        """
+        Drops idle subscriptions, then the least recently used ones until `incoming` more
+        fit (never those used at `now`). Call with the lock held; returns the dropped tokens.
+        """
+        evicted = []
+        over = len(self._pinned) + len(self._subscribed) + incoming - self.MAX_SUBSCRIPTIONS
+        for token, used_at in list(self._subscribed.items()):
+            if used_at >= now or (over <= 0 and now - used_at <= self.IDLE_EXPIRY):
+                break
+            del self._subscribed[token]
+            self._prices.pop(token, None)
+            evicted.append(token)
+            over -= 1
+        return evicted
+
+    def _send(self, subscribe=(), unsubscribe=()):
+        ticker = self._ticker
+        if not (subscribe or unsubscribe) or ticker is None or not ticker.is_connected():
+            return
+        from twisted.internet import reactor
+        # Websocket writes must happen on the reactor thread
+        def send():
+            if unsubscribe:
+                ticker.unsubscribe(unsubscribe)
+            if subscribe:
+                ticker.subscribe(subscribe)
+                ticker.set_mode(ticker.MODE_LTP, subscribe)
+        reactor.callFromThread(send)
+
+    def get_prices(self, tokens):
+        """{instrument_token: last_price} for tokens with a usable streamed price."""
+        connected = self.is_connected()
+        now = time.monotonic()
+        prices = {}
+        with self._lock:
+            for token in tokens:
+                entry = self._prices.get(token)
+                if entry and (connected or now - entry[1] <= self.STALE_AFTER):
+                    prices[token] = entry[0]
+        return prices
+
+    def get_ltp(self, instruments, kite=None):
+        """
+        Drop-in for KiteClient.fetch_ltp: {"EXCHANGE:SYMBOL": last_price}.
+        Instruments missing from the stream are fetched with kite (if given) through
+        the shared QuoteCache.
+        """
+        # The numpy-backed instrument store is imported on first use, not when the routers load
+        from app.services.instrument_service import InstrumentService
+        tokens = InstrumentService().get_instrument_tokens(instruments)
+        self.subscribe(tokens.values())
+        streamed = self.get_prices(tokens.values())
+
+        ltp_map = {}
+        missing = []
+        for key in instruments:
+            token = tokens.get(key)
+            if token in streamed:
+                ltp_map[key] = streamed[token]
+            else:
+                missing.append(key)
+
+        if missing and kite is not None:
+            ltp_map.update(QuoteCache().fetch_ltp(kite, missing))
+        return ltp_map
@@ -1,14 +1,14 @@
 import asyncio
 import logging
 from typing import Dict, Optional
-from app.services.kite_service import KiteClient
+from app.services.kite_service import KiteClientRegistry
+from app.services.background_io import run_blocking
 from app.core.config import get_settings
 
 settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
-import pandas as pd
 from app.core.database import SessionLocal
 from app.repositories.trade_repository import TradeRepository
 
@@ -25,7 +25,7 @@ class OrderMonitorService:
         if self._initialized:
             return
             
-        self.kite = KiteClient(api_key=settings.KITE_API_KEY)
+        self.kite = None # Taken from KiteClientRegistry on each poll
         self._orders_cache: Dict[str, str] = {} # order_id -> status
         self._is_running = False
         self._initialized = True
@@ -57,18 +57,8 @@ class OrderMonitorService:
     async def _check_orders(self):
         """Fetches orders and checks for status changes."""
         try:
-            # We need to ensure we have a valid session
-            # KiteClient handles token loading, but we should check if it's ready
-            if not self.kite.kite:
-                # Try to reload token if possible or just skip
-                token = self.kite.load_access_token()
-                if token:
-                    self.kite.kite.set_access_token(token)
-                else:
-                    # Not logged in yet
-                    return
-
-            orders = self.kite.get_orders()
+            # Broker call runs in the background I/O pool, off the event loop
+            orders = await run_blocking(self._fetch_orders)
             if not orders:
                 return
                 
@@ -83,7 +73,7 @@ class OrderMonitorService:
                     
                     # If it's already COMPLETE (e.g. filled while we were down), sync it
                     if status == 'COMPLETE':
-                        self._handle_order_update(order_id, status, orders)
+                        await run_blocking(self._handle_order_update, order_id, status, orders)
                         
                 else:
                     old_status = self._orders_cache[order_id]
@@ -94,7 +84,7 @@ class OrderMonitorService:
                         
                         # Trigger sync if completed
                         if status == 'COMPLETE':
-                            self._handle_order_update(order_id, status, orders)
+                            await run_blocking(self._handle_order_update, order_id, status, orders)
                         
             # Update cache to remove stale orders if needed (optional, but good for memory)
             # For now, we keep them to avoid re-alerting if they reappear (unlikely for same day)
@@ -103,11 +93,20 @@ class OrderMonitorService:
             # Log debug to avoid spam if it's just a connection issue or auth issue
             logger.debug(f"Failed to fetch orders in monitor: {e}")
 
+    def _fetch_orders(self):
+        # Use the shared client for the current token; skip until logged in
+        registry = KiteClientRegistry()
+        if not registry.access_token:
+            return None
+        self.kite = registry.get_client()
+        return self.kite.get_orders()
+
     def _handle_order_update(self, order_id: str, new_status: str, all_orders: list):
         """
         Callback for order updates.
         Syncs the order to DB if it is COMPLETE.
         """
+        import pandas as pd
         if new_status != 'COMPLETE':
             return
 
@@ -125,8 +124,12 @@ class OrderMonitorService:
             # Process using TradeRepository
             with SessionLocal() as db:
                 repo = TradeRepository(db)
-                repo.process_orders(df)
+                count = repo.process_orders(df)
                 db.commit()
+            if count:
+                # Keep newly opened positions streamed
+                from app.services.market_data_service import MarketDataService
+                MarketDataService().pin_open_positions()
                 
             logger.info(f"Successfully synced order: {order_id}")
             
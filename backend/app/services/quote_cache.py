@@ -0,0 +1,88 @@
+import threading
+import time
+from app.core.config import get_settings
+
+class _Flight:
+    """One upstream fetch that concurrent callers can wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = {}
+
+class QuoteCache:
+    """
+    TTL cache in front of KiteClient.fetch_ltp. Instruments that are already being
+    fetched by another caller are waited on instead of fetched again (singleflight),
+    so overlapping concurrent requests share a single kite.quote call.
+    """
+    _instance = None
+    WAIT_TIMEOUT = 10
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(QuoteCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._entries = {} # "EXCHANGE:SYMBOL" -> (last_price, fetched_at)
+            cls._instance._inflight = {} # "EXCHANGE:SYMBOL" -> _Flight
+            cls._instance.ttl = get_settings().QUOTE_CACHE_TTL
+            cls._instance._requests = 0
+            cls._instance._upstream_calls = 0
+            cls._instance._hits = 0
+            cls._instance._coalesced = 0
+        return cls._instance
+
+    def fetch_ltp(self, kite, instruments):
+        now = time.monotonic()
+        ltp_map = {}
+        to_fetch = []
+        waits = []
+        flight = None
+
+        with self._lock:
+            self._requests += 1
+            for key in dict.fromkeys(instruments):
+                entry = self._entries.get(key)
+                if entry and now - entry[1] <= self.ttl:
+                    ltp_map[key] = entry[0]
+                    self._hits += 1
+                elif key in self._inflight:
+                    waits.append((key, self._inflight[key]))
+                    self._coalesced += 1
+                else:
+                    to_fetch.append(key)
+            if to_fetch:
+                flight = _Flight()
+                for key in to_fetch:
+                    self._inflight[key] = flight
+                self._upstream_calls += 1
+
+        if flight is not None:
+            try:
+                flight.result = kite.fetch_ltp(to_fetch) or {}
+            finally:
+                fetched_at = time.monotonic()
+                with self._lock:
+                    for key in to_fetch:
+                        if self._inflight.get(key) is flight:
+                            del self._inflight[key]
+                    for key, value in flight.result.items():
+                        self._entries[key] = (value, fetched_at)
+                flight.done.set()
+            ltp_map.update(flight.result)
+
+        for key, other in waits:
+            other.done.wait(self.WAIT_TIMEOUT)
+            if key in other.result:
+                ltp_map[key] = other.result[key]
+
+        return ltp_map
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "requests": self._requests,
+                "upstream_calls": self._upstream_calls,
+                "cache_hits": self._hits,
+                "coalesced": self._coalesced,
+                "entries": len(self._entries)
+            }
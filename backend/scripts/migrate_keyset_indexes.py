@@ -0,0 +1,35 @@
+import sys
+import os
+from sqlalchemy import text
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import engine
+
+# Composite indexes backing keyset pagination on /trades, in the page order
+# (sort column DESC NULLS LAST, id DESC). Earlier versions created them as plain
+# (column, id), which no scan direction matches, so existing ones are rebuilt.
+INDEXES = {
+    "ix_closed_trades_entry_date_id": "entry_date",
+    "ix_closed_trades_exit_date_id": "exit_date",
+    "ix_closed_trades_pnl_id": "pnl",
+}
+
+def migrate():
+    # SQLite rejects NULLS LAST in an index; it sorts NULLs lowest, so DESC already puts them last
+    nulls = " NULLS LAST" if engine.dialect.name == 'postgresql' else ""
+    with engine.connect() as conn:
+        for name, column in INDEXES.items():
+            print(f"Creating index {name}...")
+            try:
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                conn.execute(text(f"CREATE INDEX {name} ON closed_trades ({column} DESC{nulls}, id DESC)"))
+                conn.commit()
+                print(f"Index {name} ready.")
+            except Exception as e:
+                print(f"Error creating index {name}: {e}")
+                conn.rollback()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,27 @@
+import sys
+import os
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal, engine, Base
+from app.models.all_models import SymbolPnlSummary
+from app.repositories.trade_repository import TradeRepository
+
+def rebuild():
+    # Make sure the table exists on databases created before it was added
+    Base.metadata.create_all(bind=engine, tables=[SymbolPnlSummary.__table__])
+
+    db = SessionLocal()
+    try:
+        repo = TradeRepository(db)
+        print("Rebuilding symbol_pnl_summary from closed_trades...")
+        count = repo.rebuild_symbol_pnl_summary()
+        print(f"Rebuild complete. {count} symbols.")
+    except Exception as e:
+        print(f"Error during rebuild: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild()
@@ -8,12 +8,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.core.database import SessionLocal
 from app.repositories.trade_repository import TradeRepository
 
-def run_aggregation():
+def run_aggregation(full=False):
     db = SessionLocal()
     try:
         repo = TradeRepository(db)
         print("Starting aggregation...")
-        stats = repo.aggregate_account_values()
+        stats = repo.aggregate_account_values(full=full)
         print(f"Aggregation complete. Stats: {stats}")
     except Exception as e:
         print(f"Error during aggregation: {e}")
@@ -21,4 +21,5 @@ def run_aggregation():
         db.close()
 
 if __name__ == "__main__":
-    run_aggregation()
+    # Pass --full to rebuild every bucket instead of the incremental pass
+    run_aggregation(full='--full' in sys.argv)
@@ -0,0 +1,64 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+from datetime import datetime, timedelta
+from app.services.live_account_service import LiveAccountService
+
+def candle(minute):
+    timestamp = datetime(2026, 1, 5, 10, 0) + timedelta(minutes=minute)
+    return {'timestamp': timestamp, 'open': 100.0, 'high': 101.0, 'low': 99.0, 'close': 100.5}
+
+async def run_writer(failures):
+    # A private service whose DB write fails the first `failures` times
+    class ProbeService(LiveAccountService):
+        _instance = None
+        CANDLE_WRITE_ATTEMPTS = 3
+        CANDLE_RETRY_DELAY = 0.01
+
+    service = ProbeService()
+    written = []
+    attempts = []
+
+    def save_candles(candles):
+        attempts.append(len(candles))
+        if len(attempts) <= failures:
+            return False
+        written.extend(candles)
+        return True
+
+    service._save_candles = save_candles
+    service._running = True
+    service._candle_queue = asyncio.Queue(maxsize=service.CANDLE_QUEUE_SIZE)
+    service._writer_stats = {
+        "batches": 0, "candles": 0, "dropped": 0, "failed_writes": 0, "failed_batches": 0, "lost": 0,
+        "last_write_ms": None, "total_write_ms": 0.0
+    }
+    service._writer_task = asyncio.create_task(service._candle_writer_loop())
+    service._tracking_task = asyncio.create_task(asyncio.sleep(3600))
+
+    for minute in range(3):
+        service._enqueue_candle(candle(minute))
+    service._current_candle = candle(3)
+    await service.stop_tracking()
+    return written, service.candle_writer_stats()
+
+def test_failed_batches_are_retried_then_counted_as_lost():
+    # Two failures then success: everything written, failures counted
+    written, stats = asyncio.run(run_writer(failures=2))
+    assert len(written) == 4
+    assert stats["candles"] == 4 and stats["failed_writes"] == 2
+    assert stats["failed_batches"] == 0 and stats["lost"] == 0
+
+    # Every attempt fails: nothing is reported as written, the candles are counted as lost
+    written, stats = asyncio.run(run_writer(failures=100))
+    assert written == []
+    assert stats["batches"] == 0 and stats["candles"] == 0
+    assert stats["failed_batches"] >= 1 and stats["lost"] == 4
+    print("Candle writer retry test passed!")
+
+if __name__ == "__main__":
+    test_failed_batches_are_retried_then_counted_as_lost()
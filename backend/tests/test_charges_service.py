@@ -0,0 +1,64 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import copy
+import pandas as pd
+from datetime import date, datetime
+from app.services.charges_service import ChargesService, FEE_SCHEDULE
+
+def make_df(rows):
+    return pd.DataFrame(rows, columns=['segment', 'entry_price', 'exit_price', 'qty', 'entry_date', 'exit_date'])
+
+def test_charges_per_segment():
+    df = make_df([
+        ['EQ', 100.0, 110.0, 10, datetime(2024, 1, 1), datetime(2024, 1, 5)],
+        ['FUT', 100.0, 110.0, 10, datetime(2024, 1, 1), datetime(2024, 1, 5)],
+        ['OPT', 100.0, None, 10, datetime(2024, 1, 1), None],
+        ['CDS', 100.0, 110.0, 10, datetime(2024, 1, 1), datetime(2024, 1, 5)],
+    ])
+    charges = ChargesService().breakdown(df)
+
+    # EQ: turnover 2100, no brokerage
+    eq = charges.iloc[0]
+    assert eq['brokerage'] == 0
+    assert abs(eq['stt'] - 2.1) < 1e-9
+    assert abs(eq['stamp'] - 0.15) < 1e-9
+
+    # FUT: brokerage 0.03% of turnover, capped at 40; STT on sell side only
+    fut = charges.iloc[1]
+    assert abs(fut['brokerage'] - 0.63) < 1e-9
+    assert abs(fut['stt'] - 0.11) < 1e-9
+
+    # OPT open trade: exit estimated at entry price, flat brokerage
+    opt = charges.iloc[2]
+    assert opt['brokerage'] == 40
+    assert abs(opt['stt'] - 0.5) < 1e-9
+    assert abs(opt['gst'] - 0.18 * (40 + 0.00053 * 2000 + 0.000001 * 2000)) < 1e-9
+
+    # Unknown segments carry no charges
+    assert charges.iloc[3]['total'] == 0
+
+    total = charges.drop(columns='total').sum(axis=1)
+    assert (abs(charges['total'] - total) < 1e-9).all()
+
+def test_effective_dated_rates():
+    revised = copy.deepcopy(FEE_SCHEDULE[0])
+    revised['effective_from'] = date(2024, 10, 1)
+    revised['rates']['OPT']['stt_sell'] = 0.001
+    service = ChargesService(FEE_SCHEDULE + [revised])
+
+    df = make_df([
+        ['OPT', 100.0, 100.0, 10, datetime(2024, 9, 1), datetime(2024, 9, 30)],
+        ['OPT', 100.0, 100.0, 10, datetime(2024, 9, 1), datetime(2024, 10, 1)],
+    ])
+    stt = service.breakdown(df)['stt']
+    assert abs(stt.iloc[0] - 0.5) < 1e-9
+    assert abs(stt.iloc[1] - 1.0) < 1e-9
+
+if __name__ == "__main__":
+    test_charges_per_segment()
+    test_effective_dated_rates()
+    print("Test Passed!")
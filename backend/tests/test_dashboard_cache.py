@@ -0,0 +1,51 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import time
+from app.services.dashboard_cache import DashboardCache
+
+def test_dashboard_cache_hits_until_version_bump():
+    cache = DashboardCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    before = cache.stats()
+    assert cache.get_or_compute('D', compute) == {"n": 1}
+    assert cache.get_or_compute('D', compute) == {"n": 1}
+    assert cache.get_or_compute('W', compute) == {"n": 2}
+
+    cache.bump_version()
+    assert cache.get_or_compute('D', compute) == {"n": 3}
+
+    after = cache.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 3
+    assert after["version"] == before["version"] + 1
+    print("Dashboard cache test passed!")
+
+def test_live_slice_expires_without_version_bump():
+    cache = DashboardCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    version = cache.version
+    assert cache.get_or_compute('live-probe', compute, ttl=0.05) == 1
+    assert cache.get_or_compute('live-probe', compute, ttl=0.05) == 1
+    time.sleep(0.1)
+    # New candles need no bump; the slice is simply recomputed once its TTL passes
+    assert cache.get_or_compute('live-probe', compute, ttl=0.05) == 2
+    assert cache.version == version
+    print("Dashboard live slice test passed!")
+
+if __name__ == "__main__":
+    test_dashboard_cache_hits_until_version_bump()
+    test_live_slice_expires_without_version_bump()
@@ -0,0 +1,56 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from app.services.greeks_service import bs_price, bs_delta, implied_volatility
+
+def make_chain(n=500, seed=7):
+    rng = np.random.default_rng(seed)
+    S = rng.uniform(100, 30000, n)
+    K = S * rng.uniform(0.8, 1.2, n)
+    T = rng.uniform(2 / 365, 0.5, n)
+    r = rng.uniform(0.04, 0.10, n)
+    sigma = rng.uniform(0.08, 0.9, n)
+    flag = np.where(rng.random(n) < 0.5, 1.0, -1.0)
+    return S, K, T, r, sigma, flag
+
+def test_iv_round_trip_and_no_arbitrage_bounds():
+    S, K, T, r, sigma, flag = make_chain()
+    price = bs_price(S, K, T, r, sigma, flag)
+    intrinsic = np.maximum(flag * (S - K * np.exp(-r * T)), 0)
+    # Only contracts with at least one tick of time value have a well defined IV
+    quoted = price - intrinsic >= 0.05
+
+    iv = implied_volatility(price, S, K, T, r, flag)
+    assert np.allclose(iv[quoted], sigma[quoted], atol=1e-6)
+
+    # Below intrinsic, zero price and expired contracts have no IV
+    bad = implied_volatility([1.0, 0.0, 5.0], [100, 100, 100], [50, 100, 100], [0.1, 0.1, 0.0], 0.07, [1, 1, 1])
+    assert np.isnan(bad).all()
+
+    # Expired contracts: delta is 1/-1 when ITM, 0 otherwise
+    assert list(bs_delta([100, 100, 100, 100], [90, 110, 110, 90], 0, 0.07, 0.2, [1, 1, -1, -1])) == [1.0, 0.0, -1.0, 0.0]
+    print("Greeks engine round trip test passed!")
+
+def test_matches_py_vollib():
+    iv_ref = pytest.importorskip("py_vollib.black_scholes.implied_volatility")
+    greeks_ref = pytest.importorskip("py_vollib.black_scholes.greeks.analytical")
+    S, K, T, r, sigma, flag = make_chain(n=200)
+    price = bs_price(S, K, T, r, sigma, flag)
+    flags = ['c' if f > 0 else 'p' for f in flag]
+
+    expected_iv = np.array([iv_ref.implied_volatility(*args) for args in zip(price, S, K, T, r, flags)])
+    expected_delta = np.array([greeks_ref.delta(*args) for args in zip(flags, S, K, T, r, sigma)])
+    intrinsic = np.maximum(flag * (S - K * np.exp(-r * T)), 0)
+    quoted = price - intrinsic >= 0.05
+
+    assert np.allclose(implied_volatility(price, S, K, T, r, flag)[quoted], expected_iv[quoted], atol=1e-6)
+    assert np.allclose(bs_delta(S, K, T, r, sigma, flag), expected_delta, atol=1e-9)
+
+if __name__ == "__main__":
+    test_iv_round_trip_and_no_arbitrage_bounds()
+    test_matches_py_vollib()
@@ -0,0 +1,79 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tempfile
+from datetime import date
+import numpy as np
+import pandas as pd
+from app.services.instrument_store import InstrumentStore
+from app.services.instrument_search import InstrumentSearchIndex
+
+DUMP = pd.DataFrame([
+    {'instrument_token': 738561, 'exchange_token': 2885, 'tradingsymbol': 'RELIANCE', 'name': 'RELIANCE INDUSTRIES',
+     'last_price': 0.0, 'expiry': '', 'strike': 0.0, 'tick_size': 0.05, 'lot_size': 1,
+     'instrument_type': 'EQ', 'segment': 'NSE', 'exchange': 'NSE'},
+    {'instrument_token': 128083204, 'exchange_token': 500325, 'tradingsymbol': 'RELIANCE', 'name': 'RELIANCE INDUSTRIES',
+     'last_price': 0.0, 'expiry': '', 'strike': 0.0, 'tick_size': 0.05, 'lot_size': 1,
+     'instrument_type': 'EQ', 'segment': 'BSE', 'exchange': 'BSE'},
+    {'instrument_token': 12345602, 'exchange_token': 48225, 'tradingsymbol': 'NIFTY24MAR22000CE', 'name': 'NIFTY',
+     'last_price': 0.0, 'expiry': date(2024, 3, 27), 'strike': 22000.0, 'tick_size': 0.05, 'lot_size': 50,
+     'instrument_type': 'CE', 'segment': 'NFO-OPT', 'exchange': 'NFO'},
+])
+
+def test_round_trip_and_lookups():
+    directory = tempfile.mkdtemp()
+    store = InstrumentStore(directory)
+    assert not store.reload()
+    store.save(DUMP)
+
+    # Columns are memory-mapped and typed
+    assert isinstance(store.column('instrument_token'), np.memmap)
+    assert store.column('expiry').dtype == np.dtype('datetime64[D]')
+
+    rows = store.find(['NSE:RELIANCE', 'NFO:NIFTY24MAR22000CE', 'NSE:UNKNOWN'])
+    assert set(rows) == {'NSE:RELIANCE', 'NFO:NIFTY24MAR22000CE'}
+    assert store.column('instrument_token')[rows['NSE:RELIANCE']] == 738561
+    assert len(store.find_symbol('RELIANCE')) == 2
+    assert store.find_symbol('NIFTY') == []
+
+    # The frame reads back like the Kite dump
+    frame = store.frame(exchanges=['NFO'])
+    assert frame.to_dict('records') == DUMP[DUMP['exchange'] == 'NFO'].to_dict('records')
+    assert store.frame(exchanges=['NSE'])['expiry'].tolist() == ['']
+    assert store.is_fresh(['NSE', 'NFO'], pd.Timedelta(days=1))
+    assert not store.is_fresh(['MCX'], pd.Timedelta(days=1))
+
+    # Another process saving a new version is picked up on the next access
+    other = InstrumentStore(directory)
+    other.save(DUMP[DUMP['exchange'] == 'NSE'])
+    store._checked_at = 0.0
+    assert len(store) == 1
+    assert len([d for d in os.listdir(directory) if d.isdigit()]) == 2
+    print("Instrument store round trip test passed!")
+
+def test_search_ranks_prefix_matches_first():
+    store = InstrumentStore(tempfile.mkdtemp())
+    store.save(pd.concat([DUMP, pd.DataFrame([
+        {'instrument_token': 1, 'tradingsymbol': 'NIFTYBEES', 'name': 'NIPPON INDIA ETF NIFTY BEES', 'exchange': 'NSE'},
+        {'instrument_token': 2, 'tradingsymbol': 'ABCAPITAL', 'name': 'ADITYA BIRLA CAPITAL', 'exchange': 'NSE'},
+    ])], ignore_index=True))
+    index = InstrumentSearchIndex(store)
+
+    def symbols(query, exchange=None):
+        return [(r['exchange'], r['tradingsymbol']) for r in store.records(index.search(query, exchange=exchange))]
+
+    # Symbol prefix matches rank ahead of instruments whose name merely contains the query
+    assert symbols('nifty') == [('NFO', 'NIFTY24MAR22000CE'), ('NSE', 'NIFTYBEES')]
+    assert symbols('ETF NIFTY') == [('NSE', 'NIFTYBEES')]
+    assert symbols('birla') == [('NSE', 'ABCAPITAL')]
+    assert symbols('RELIANCE', exchange='BSE') == [('BSE', 'RELIANCE')]
+    assert symbols('NIFTY', exchange='BSE') == []
+    assert symbols('zzz') == []
+    print("Instrument search ranking test passed!")
+
+if __name__ == "__main__":
+    test_round_trip_and_lookups()
+    test_search_ranks_prefix_matches_first()
@@ -0,0 +1,88 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from app.services.kite_service import KiteClient
+from app.services.margin_cache import MarginCache
+
+class FakeKite:
+    """Stands in for KiteConnect's margin endpoints, recording calls and concurrency."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.order_calls = []
+        self.basket_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def order_margins(self, orders):
+        self.order_calls.append(orders)
+        if any(order['tradingsymbol'] == 'BADSYMBOL' for order in orders):
+            raise Exception("Invalid `tradingsymbol`")
+        return [{'total': order['quantity'] * 10.0} for order in orders]
+
+    def basket_order_margins(self, orders):
+        with self.lock:
+            self.basket_calls.append(orders)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.3) # slower than the rate limiter spacing, as real calls are
+        with self.lock:
+            self.in_flight -= 1
+        return {'initial': {'total': 500.0}, 'final': {'total': 100.0 * len(orders)}}
+
+def leg(symbol, qty):
+    return {'exchange': 'NFO', 'tradingsymbol': symbol, 'transaction_type': 'SELL', 'quantity': qty, 'product': 'NRML'}
+
+def test_trades_batched_baskets_concurrent_and_cached():
+    client = KiteClient.__new__(KiteClient)
+    client.kite = FakeKite()
+    MarginCache()._entries.clear()
+
+    trades = [{'type': 'TRADE', 'id': f"t{i}", 'constituents': [leg(f"NIFTY{i}CE", i + 1)]} for i in range(40)]
+    baskets = [
+        {'type': 'BASKET', 'id': f"b{i}", 'constituents': [leg(f"NIFTY{i}CE", 75), leg(f"NIFTY{i}PE", 75)]}
+        for i in range(6)
+    ]
+    margins = client.fetch_margins(trades + baskets)
+
+    # One order_margins request for all 40 trades, mapped back by position
+    assert len(client.kite.order_calls) == 1 and len(client.kite.order_calls[0]) == 40
+    assert margins['t0'] == 10.0 and margins['t39'] == 400.0
+    # Baskets fan out concurrently
+    assert len(client.kite.basket_calls) == 6 and client.kite.max_in_flight > 1
+    assert margins['b0'] == 200.0
+
+    # Unchanged items come from cache; a changed basket (legs reordered is not a change) is re-queried
+    baskets[1]['constituents'].reverse()
+    baskets[2]['constituents'][0]['quantity'] = 150
+    margins = client.fetch_margins(trades + baskets)
+    assert len(client.kite.order_calls) == 1
+    assert len(client.kite.basket_calls) == 7
+    assert margins['t5'] == 60.0 and margins['b1'] == 200.0
+    print("Margin batching test passed!")
+
+def test_one_bad_trade_does_not_zero_the_batch():
+    client = KiteClient.__new__(KiteClient)
+    client.kite = FakeKite()
+    MarginCache()._entries.clear()
+
+    items = [
+        {'type': 'TRADE', 'id': 'good1', 'constituents': [leg('GOOD1CE', 1)]},
+        {'type': 'TRADE', 'id': 'bad', 'constituents': [leg('BADSYMBOL', 1)]},
+        {'type': 'TRADE', 'id': 'good2', 'constituents': [leg('GOOD2CE', 2)]},
+        {'type': 'TRADE', 'constituents': [leg('NOIDCE', 1)]},
+    ]
+    margins = client.fetch_margins(items)
+
+    # The rejected batch is retried per trade; only the bad row gets 0, items without an id are skipped
+    assert margins == {'good1': 10.0, 'bad': 0, 'good2': 20.0}
+    assert len(client.kite.order_calls) == 4
+    print("Margin batch fallback test passed!")
+
+if __name__ == "__main__":
+    test_trades_batched_baskets_concurrent_and_cached()
+    test_one_bad_trade_does_not_zero_the_batch()
@@ -0,0 +1,134 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import struct
+import tempfile
+import time
+import pandas as pd
+from autobahn.twisted.websocket import WebSocketServerProtocol, WebSocketServerFactory
+from twisted.internet import reactor
+from app.services.instrument_service import InstrumentService
+from app.services.instrument_store import InstrumentStore
+from app.services.market_data_service import MarketDataService
+
+# Ticks recorded from an LTP-mode session, replayed frame by frame (prices in rupees)
+RECORDED_TICKS = [
+    [(256265, 24310.55), (738561, 2950.10)],
+    [(256265, 24312.00)],
+    [(738561, 2951.45), (256265, 24311.25)],
+]
+
+def pack_frame(ticks):
+    """Encode ticks the way Kite's binary protocol does for LTP mode packets."""
+    body = struct.pack('>H', len(ticks))
+    for token, price in ticks:
+        body += struct.pack('>H', 8) + struct.pack('>II', token, int(round(price * 100)))
+    return body
+
+class FakeTickerProtocol(WebSocketServerProtocol):
+    subscriptions = []
+
+    def onMessage(self, payload, isBinary):
+        message = json.loads(payload)
+        if message['a'] == 'subscribe':
+            FakeTickerProtocol.subscriptions.append(message['v'])
+            for frame in RECORDED_TICKS:
+                self.sendMessage(pack_frame(frame), isBinary=True)
+
+def start_fake_ticker():
+    factory = WebSocketServerFactory()
+    factory.protocol = FakeTickerProtocol
+    port = reactor.listenTCP(0, factory, interface='127.0.0.1')
+    return f"ws://127.0.0.1:{port.getHost().port}"
+
+class FakeKite:
+    def __init__(self):
+        self.calls = []
+
+    def fetch_ltp(self, instruments):
+        self.calls.append(list(instruments))
+        return {key: 1.0 for key in instruments}
+
+def wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_ticks_from_fake_server_feed_ltp_table():
+    # The instrument singleton gets a throwaway store, restored afterwards
+    instruments = InstrumentService()
+    original_store = instruments.store
+    instruments.store = InstrumentStore(tempfile.mkdtemp())
+
+    # A private service; the app-wide one keeps its subscriptions and prices
+    class ProbeService(MarketDataService):
+        _instance = None
+
+    service = ProbeService()
+    try:
+        instruments.store.save(pd.DataFrame({
+            'instrument_token': [256265, 738561],
+            'tradingsymbol': ['NIFTY 50', 'RELIANCE'],
+            'exchange': ['NSE', 'NSE']
+        }))
+        kite = FakeKite()
+
+        # Before the stream is up everything comes from REST and gets subscribed
+        assert service.get_ltp(['NSE:NIFTY 50', 'NSE:RELIANCE'], kite) == {'NSE:NIFTY 50': 1.0, 'NSE:RELIANCE': 1.0}
+        assert kite.calls == [['NSE:NIFTY 50', 'NSE:RELIANCE']]
+
+        service.start('api_key', 'access_token', root=start_fake_ticker())
+        assert wait_for(lambda: len(service.get_prices([256265, 738561])) == 2)
+        assert wait_for(lambda: service.get_prices([256265])[256265] == 24311.25)
+        assert sorted(FakeTickerProtocol.subscriptions[0]) == [256265, 738561]
+
+        # Streamed instruments no longer hit REST; unknown ones still do
+        ltp_map = service.get_ltp(['NSE:NIFTY 50', 'NSE:RELIANCE', 'NSE:UNKNOWN'], kite)
+        assert ltp_map == {'NSE:NIFTY 50': 24311.25, 'NSE:RELIANCE': 2951.45, 'NSE:UNKNOWN': 1.0}
+        assert kite.calls[-1] == ['NSE:UNKNOWN']
+    finally:
+        service.stop()
+        instruments.store = original_store
+    print("Market data service test passed!")
+
+def test_idle_and_overflow_subscriptions_are_dropped_but_pins_stay():
+    # A private service with a small limit; no ticker, so nothing goes over the wire
+    class ProbeService(MarketDataService):
+        _instance = None
+        MAX_SUBSCRIPTIONS = 4
+        IDLE_EXPIRY = 0.2
+
+    service = ProbeService()
+    service.pin([1, 2])
+    assert sorted(service.subscribe([10, 11])) == [10, 11]
+    time.sleep(0.01)
+    service.subscribe([10]) # 11 is now the least recently used
+
+    # Over the limit: the least recently used unpinned token makes room
+    assert service.subscribe([12]) == [12]
+    assert set(service._subscribed) == {10, 12} and service._pinned == {1, 2}
+
+    # Ticks for dropped tokens are ignored
+    service._on_ticks(None, [{'instrument_token': 11, 'last_price': 5.0}, {'instrument_token': 1, 'last_price': 7.0}])
+    assert service.get_prices([1, 11]) == {1: 7.0}
+
+    # Idle tokens expire on the next request; pins never do
+    time.sleep(0.3)
+    service.subscribe([13])
+    assert set(service._subscribed) == {13} and service._pinned == {1, 2}
+
+    # Positions that closed are unpinned and expire like any other token
+    service.pin([1])
+    assert 2 in service._subscribed
+    print("Market data subscription expiry test passed!")
+
+if __name__ == "__main__":
+    test_ticks_from_fake_server_feed_ltp_table()
+    test_idle_and_overflow_subscriptions_are_dropped_but_pins_stay()
@@ -0,0 +1,57 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from app.core.config import get_settings
+from app.services.quote_cache import QuoteCache
+
+class SlowKite:
+    def __init__(self):
+        self.calls = []
+
+    def fetch_ltp(self, instruments):
+        self.calls.append(sorted(instruments))
+        time.sleep(0.2)
+        return {key: float(len(key)) for key in instruments}
+
+def test_concurrent_overlapping_requests_share_upstream_call():
+    # A private cache with a long TTL; the app-wide singleton is left untouched
+    class ProbeCache(QuoteCache):
+        _instance = None
+
+    cache = ProbeCache()
+    cache.ttl = 5
+    kite = SlowKite()
+
+    results = []
+    def request():
+        results.append(cache.fetch_ltp(kite, ['NSE:INFY', 'NSE:TCS']))
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    threads[0].start()
+    time.sleep(0.05) # let the first caller start its fetch
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert kite.calls == [['NSE:INFY', 'NSE:TCS']]
+    assert all(r == {'NSE:INFY': 8.0, 'NSE:TCS': 7.0} for r in results)
+
+    # Fresh entries are served without going upstream; new keys are fetched alone
+    assert cache.fetch_ltp(kite, ['NSE:INFY', 'NSE:SBIN']) == {'NSE:INFY': 8.0, 'NSE:SBIN': 8.0}
+    assert kite.calls[-1] == ['NSE:SBIN']
+
+    stats = cache.stats()
+    assert stats["requests"] == 6
+    assert stats["upstream_calls"] == 2
+    # The app-wide cache keeps its configured TTL
+    assert QuoteCache().ttl == get_settings().QUOTE_CACHE_TTL
+    print("Quote cache test passed!")
+
+if __name__ == "__main__":
+    test_concurrent_overlapping_requests_share_upstream_call()
@@ -0,0 +1,22 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Loaded on first use by the endpoints that need them, never by importing the app
+HEAVY_MODULES = ['numpy', 'scipy', 'pandas', 'app.services.instrument_service', 'app.services.greeks_service']
+
+def test_importing_the_app_skips_heavy_modules():
+    # A fresh interpreter, since this test process may already have them loaded
+    code = f"import sys, app.main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+    print("Startup import test passed!")
+
+if __name__ == "__main__":
+    test_importing_the_app_skips_heavy_modules()
@@ -0,0 +1,60 @@
+import sys
+import os
+
+# Add backend directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models.all_models import ClosedTrade, OpenTrade
+from app.repositories.trade_repository import TradeRepository
+
+def make_repo():
+    # Private in-memory database with ties and missing values in every sort column
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    base = datetime(2025, 1, 1)
+    for i in range(30):
+        db.add(ClosedTrade(
+            symbol=f"C{i}",
+            entry_date=None if i % 7 == 0 else base + timedelta(days=i % 4),
+            exit_date=None if i % 5 == 0 else base + timedelta(days=i % 3),
+            pnl=None if i % 6 == 0 else float(i % 4),
+            closure_type='PARTIAL' if i % 3 == 0 else 'FULL'
+        ))
+    for i in range(10):
+        db.add(OpenTrade(symbol=f"O{i}", entry_date=base + timedelta(days=i % 4), avg_price=100.0))
+    db.commit()
+    return TradeRepository(db)
+
+def test_cursor_pages_match_offset_order():
+    repo = make_repo()
+    for sort_by in ('entry_date', 'exit_date', 'pnl'):
+        for sort_desc in (True, False):
+            for status in (None, 'CLOSED', 'OPEN'):
+                full = repo.get_paginated_trades(limit=100, sort_by=sort_by, sort_desc=sort_desc, status=status)
+                expected = [t['id'] for t in full['data']]
+                assert full['total'] == len(expected)
+
+                walked, cursor = [], None
+                while True:
+                    page = repo.get_paginated_trades(limit=4, sort_by=sort_by, sort_desc=sort_desc, status=status, cursor=cursor)
+                    walked += [t['id'] for t in page['data']]
+                    assert page['page'] is None if cursor else page['page'] == 1
+                    cursor = page['next_cursor']
+                    if not cursor:
+                        break
+                assert walked == expected, (sort_by, sort_desc, status)
+
+    # Missing values sort last when descending, first when ascending
+    data = repo.get_paginated_trades(limit=100, sort_by='pnl', sort_desc=True)['data']
+    assert data[0]['pnl'] == 3.0 and data[-1]['pnl'] is None
+    data = repo.get_paginated_trades(limit=100, sort_by='pnl', sort_desc=False)['data']
+    assert data[0]['pnl'] is None and data[-1]['pnl'] == 3.0
+    print("Trade pagination test passed!")
+
+if __name__ == "__main__":
+    test_cursor_pages_match_offset_order()
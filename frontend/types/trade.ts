@@ -34,8 +34,9 @@ export interface UnifiedTrade {
 export interface PaginatedTradesResponse {
     data: UnifiedTrade[];
     total: number;
-    page: number;
+    page: number | null;
     page_size: number;
+    next_cursor?: string | null;
 }
 
 export interface TradeUpdate {